@@ -0,0 +1,67 @@
+"""Compare signal scoring latency of compiled models against scikit-learn predict_proba
+
+Run from the backend directory:
+
+    python -m benchmarks.inference_benchmark --model random_forest --batch-sizes 1,10,100,1000,10000,100000
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from compiled_model import compile_model, load_compiled_model
+from models import build_model
+from trading_strategy import FEATURES
+
+
+def time_call(fn, X: np.ndarray, repeats: int) -> float:
+    """Median seconds per call over `repeats` calls, after one warm-up call"""
+    fn(X)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="random_forest")
+    parser.add_argument("--train-rows", type=int, default=2000)
+    parser.add_argument("--batch-sizes", default="1,10,100,1000,10000,100000")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    # Feature-like inputs: the strategy's features on a synthetic random walk are close to Gaussian
+    rng = np.random.default_rng(42)
+    X_train = rng.normal(size=(args.train_rows, len(FEATURES)))
+    y_train = (X_train[:, 0] + rng.normal(size=args.train_rows) > 0).astype(int)
+    model = build_model(args.model).fit(X_train, y_train)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        compile_model(model).save(tmp)
+        compiled = load_compiled_model(tmp)
+
+        results = []
+        for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+            X = rng.normal(size=(batch_size, len(FEATURES)))
+            repeats = max(1, min(args.repeats, 1_000_000 // batch_size))
+            sklearn_seconds = time_call(model.predict_proba, X, repeats)
+            compiled_seconds = time_call(compiled.predict_proba, X, repeats)
+            results.append({
+                "batch_size": batch_size,
+                "identical": bool(np.array_equal(model.predict_proba(X), compiled.predict_proba(X))),
+                "sklearn_ms": round(sklearn_seconds * 1000, 3),
+                "compiled_ms": round(compiled_seconds * 1000, 3),
+                "speedup": round(sklearn_seconds / compiled_seconds, 2)
+            })
+        del compiled
+
+    print(json.dumps({"model": args.model, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
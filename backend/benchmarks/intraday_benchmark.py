@@ -0,0 +1,55 @@
+"""Measure intraday backtest throughput on synthetic minute bars
+
+Run from the backend directory:
+
+    python -m benchmarks.intraday_benchmark --bars 2000000 --tickers 4 --format csv
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from intraday_backtest import IntradayBacktestEngine, train_model_on_bars
+
+
+def write_synthetic_bars(path: str, bars: int, tickers: int, fmt: str, seed: int = 42):
+    """Write interleaved random-walk minute bars for several tickers"""
+    rng = np.random.default_rng(seed)
+    per_ticker = bars // tickers
+    timestamps = pd.date_range("2015-01-02 09:30", periods=per_ticker, freq="min")
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, (per_ticker, tickers)), axis=0))
+
+    frame = pd.DataFrame({
+        "timestamp": np.repeat(timestamps.values, tickers),
+        "ticker": np.tile([f"T{i}" for i in range(tickers)], per_ticker),
+        "close": closes.reshape(-1)
+    })
+    if fmt == "parquet":
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=2_000_000)
+    parser.add_argument("--tickers", type=int, default=4)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--model", default="random_forest")
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"bars.{args.format}")
+        write_synthetic_bars(path, args.bars, args.tickers, args.format)
+        model = train_model_on_bars([path], max_bars=50_000, model_type=args.model)
+        result = IntradayBacktestEngine(model, chunksize=args.chunksize).run([path])
+
+    print(json.dumps(result["throughput"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Offline load test of the QuantEase API with per-endpoint latency reports
+
+Run from the backend directory, either against the app in-process (prices come from
+the synthetic data provider, so no network is needed):
+
+    python -m benchmarks.loadtest --concurrency 16 --duration 30
+
+or against a server on localhost started with DATA_PROVIDER=synthetic:
+
+    python -m benchmarks.loadtest --url http://localhost:8000 --rate 50 --duration 60 \\
+        --mix recommendation=0.7,strategy=0.1,chat=0.2 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Dict, Any, Optional
+
+import httpx
+import numpy as np
+
+SCENARIOS = ("recommendation", "strategy", "chat")
+DEFAULT_MIX = "recommendation=0.8,strategy=0.05,chat=0.15"
+
+# One scripted chatbot session: ticker, start date, model, threshold, capital, confirmation
+CHAT_SCRIPT = ["QQQ", "2019-01-01", "logistic regression", "0.6", "$10,000", "yes, confirm"]
+
+
+class Recorder:
+    """Collects latency and status for every request, keyed by endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sessions = defaultdict(lambda: {"completed": 0, "failed": 0, "latencies": []})
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        """Send one request and record it under the endpoint's route template"""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            # Transport failures and, in-process, exceptions the app raised count as errors
+            response = None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if response is None or response.status_code >= 400:
+            self.errors[endpoint] += 1
+            return None
+        return response
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """Throughput, latency percentiles and error rate per endpoint and scenario"""
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            ms = np.array(latencies) * 1000
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / len(latencies), 4),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "latency_ms": _latency_summary(ms)
+            }
+
+        scenarios = {}
+        for name, session in sorted(self.sessions.items()):
+            total = session["completed"] + session["failed"]
+            scenarios[name] = {
+                "sessions": total,
+                "failed": session["failed"],
+                "throughput_per_s": round(total / elapsed, 2),
+                "latency_ms": _latency_summary(np.array(session["latencies"]) * 1000)
+            }
+
+        total_requests = sum(len(latencies) for latencies in self.latencies.values())
+        total_errors = sum(self.errors.values())
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "requests": total_requests,
+            "errors": total_errors,
+            "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+            "throughput_rps": round(total_requests / elapsed, 2),
+            "endpoints": endpoints,
+            "scenarios": scenarios
+        }
+
+
+def _latency_summary(ms: np.ndarray) -> Dict[str, Optional[float]]:
+    """p50/p95/p99, mean and max of a latency sample in milliseconds"""
+    if not len(ms):
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "mean": round(float(ms.mean()), 2),
+        "max": round(float(ms.max()), 2)
+    }
+
+
+async def recommendation_session(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, session_id: int) -> bool:
+    """A single portfolio recommendation for a random profile"""
+    profile = {
+        "user_id": f"load_{session_id}",
+        "risk_score": rng.randint(1, 10),
+        "diversification": rng.choice(["concentrated", "balanced", "diversified"]),
+        "horizon_years": rng.randint(1, 30),
+        "capital_usd": rng.choice([5000, 25000, 100000])
+    }
+    return await recorder.request(client, "POST /recommendation", "POST", "/recommendation", json=profile) is not None
+
+
+async def strategy_session(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, session_id: int) -> bool:
+    """A single trading strategy run"""
+    params = {
+        "ticker": rng.choice(["SPY", "QQQ", "EFA"]),
+        "start_date": rng.choice(["2015-01-01", "2018-01-01", "2020-01-01"]),
+        "model_type": rng.choice(["random_forest", "logistic_regression"]),
+        "threshold": rng.choice([0.55, 0.6, 0.65])
+    }
+    return await recorder.request(client, "POST /trading-strategy/run", "POST", "/trading-strategy/run", json=params) is not None
+
+
+async def chat_session(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, session_id: int) -> bool:
+    """A multi-turn chatbot conversation, from start through confirmation"""
+    response = await recorder.request(client, "POST /conversation/start", "POST", "/conversation/start",
+                                      params={"user_id": f"load_{session_id}"})
+    if response is None:
+        return False
+    conversation_id = response.json()["conversation_id"]
+
+    for message in CHAT_SCRIPT:
+        response = await recorder.request(client, "POST /conversation/{conversation_id}", "POST",
+                                          f"/conversation/{conversation_id}", json={"message": message})
+        if response is None:
+            return False
+    # The confirmation runs the strategy; a session that never reaches it has not been measured
+    reply = response.json()
+    if not (reply.get("complete") and reply.get("strategy_results")):
+        return False
+    return await recorder.request(client, "GET /conversation/{conversation_id}", "GET",
+                                  f"/conversation/{conversation_id}") is not None
+
+
+SESSIONS = {
+    "recommendation": recommendation_session,
+    "strategy": strategy_session,
+    "chat": chat_session,
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse 'name=weight,...' into normalized scenario weights"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SESSIONS:
+            raise ValueError(f"Unknown scenario: {name}")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Scenario weights must sum to a positive number")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+async def run_load(client: httpx.AsyncClient, mix: Dict[str, float], concurrency: int,
+                   duration: Optional[float], sessions: Optional[int], rate: Optional[float],
+                   seed: int = 42) -> Dict[str, Any]:
+    """Drive the API with a scenario mix, closed-loop or with Poisson arrivals at `rate` per second"""
+    rng = random.Random(seed)
+    recorder = Recorder()
+    names, weights = list(mix), list(mix.values())
+    semaphore = asyncio.Semaphore(concurrency)
+    counter = iter(range(sessions if sessions is not None else 2 ** 62))
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+
+    def expired() -> bool:
+        return deadline is not None and time.perf_counter() >= deadline
+
+    async def one_session(session_id: int):
+        name = rng.choices(names, weights)[0]
+        session_start = time.perf_counter()
+        async with semaphore:
+            ok = await SESSIONS[name](client, recorder, rng, session_id)
+        stats = recorder.sessions[name]
+        stats["completed" if ok else "failed"] += 1
+        stats["latencies"].append(time.perf_counter() - session_start)
+
+    if rate is None:
+        # Closed loop: each worker starts its next session as soon as the last one finishes
+        async def worker():
+            for session_id in counter:
+                if expired():
+                    break
+                await one_session(session_id)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    else:
+        # Open loop: sessions arrive on a Poisson schedule regardless of completions
+        tasks = []
+        for session_id in counter:
+            if expired():
+                break
+            tasks.append(asyncio.create_task(one_session(session_id)))
+            await asyncio.sleep(rng.expovariate(rate))
+        await asyncio.gather(*tasks)
+
+    report = recorder.report(time.perf_counter() - start)
+    report["config"] = {
+        "mix": mix,
+        "concurrency": concurrency,
+        "rate": rate,
+        "duration": duration,
+        "sessions": sessions,
+        "seed": seed
+    }
+    return report
+
+
+def make_client(url: Optional[str], timeout: float) -> httpx.AsyncClient:
+    """A client for a server over HTTP, or for the app in-process"""
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=timeout)
+
+    # In-process runs never touch the network
+    import data_provider
+    data_provider.set_data_provider(data_provider.SyntheticDataProvider())
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://loadtest", timeout=timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server; the app runs in-process when omitted")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. recommendation=0.8,chat=0.2")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum sessions in flight")
+    parser.add_argument("--rate", type=float, help="Poisson session arrivals per second (open loop)")
+    parser.add_argument("--duration", type=float, help="Seconds to run for")
+    parser.add_argument("--sessions", type=int, help="Number of sessions to run")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    if args.duration is None and args.sessions is None:
+        args.sessions = 200
+
+    async def run():
+        async with make_client(args.url, args.timeout) as client:
+            return await run_load(client, parse_mix(args.mix), args.concurrency,
+                                  args.duration, args.sessions, args.rate, args.seed)
+
+    report = asyncio.run(run())
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
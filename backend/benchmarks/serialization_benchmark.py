@@ -0,0 +1,101 @@
+"""Compare payload size and serialization time of JSON against the columnar formats
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization_benchmark --rows 2500 25000 250000
+"""
+import argparse
+import gzip
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from columnar import strategy_columns, to_arrow_ipc, to_msgpack, available_formats
+
+
+def synthetic_strategy_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build a backtested strategy frame with the same columns as `TradingStrategy.backtest`"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("1990-01-01", periods=rows)
+    next_return = rng.normal(0.0004, 0.01, rows)
+    probability = rng.uniform(0, 1, rows)
+    signal = np.where(probability > 0.6, 1, np.where(probability < 0.4, -1, 0))
+    position = np.concatenate([[0], signal[:-1]]).astype(float)
+    strategy_return = position * next_return
+
+    return pd.DataFrame({
+        "Close": 100 * np.cumprod(1 + next_return),
+        "Probability": probability,
+        "Signal": signal,
+        "Position": position,
+        "Strategy_Return": strategy_return,
+        "Portfolio_Value": 10000 * np.cumprod(1 + strategy_return),
+        "Buy_Hold_Value": 10000 * np.cumprod(1 + next_return),
+    }, index=index)
+
+
+def _json_payload(data: pd.DataFrame, metadata) -> bytes:
+    """The JSON equivalent: one record per row, as FastAPI would return it"""
+    records = data.reset_index(names="date")
+    records["date"] = records["date"].dt.strftime("%Y-%m-%d")
+    payload = dict(metadata)
+    payload["series"] = records.to_dict(orient="records")
+    return json.dumps(payload).encode()
+
+
+def _time(fn, repeat: int):
+    """Best-of-`repeat` wall time in milliseconds, with the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run_benchmark(rows: int, repeat: int = 5):
+    """Serialize one synthetic strategy frame in every available format"""
+    data = synthetic_strategy_frame(rows)
+    metadata = {"summary": {"ticker": "SYN"}, "metrics": {"sharpe_ratio": 1.0}}
+
+    encoders = {
+        "json": lambda: _json_payload(data, metadata),
+        "json+gzip": lambda: gzip.compress(_json_payload(data, metadata), compresslevel=6),
+    }
+    formats = available_formats()
+    if formats["msgpack"]:
+        encoders["msgpack"] = lambda: to_msgpack(strategy_columns(data), metadata)
+        encoders["msgpack+gzip"] = lambda: gzip.compress(to_msgpack(strategy_columns(data), metadata), compresslevel=6)
+    if formats["arrow"]:
+        encoders["arrow"] = lambda: to_arrow_ipc(strategy_columns(data), metadata, compression=None)
+        encoders["arrow+zstd"] = lambda: to_arrow_ipc(strategy_columns(data), metadata, compression="zstd")
+
+    results = {}
+    for name, encode in encoders.items():
+        ms, payload = _time(encode, repeat)
+        results[name] = {"bytes": len(payload), "ms": round(ms, 3)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[2500, 25000, 250000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    report = {}
+    for rows in args.rows:
+        results = run_benchmark(rows, args.repeat)
+        baseline = results["json"]
+        for entry in results.values():
+            entry["size_vs_json"] = round(entry["bytes"] / baseline["bytes"], 4)
+            entry["speedup_vs_json"] = round(baseline["ms"] / entry["ms"], 2) if entry["ms"] > 0 else None
+        report[rows] = results
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import csv
+import io
+import json
+import time
+from typing import Callable, Dict, List, Any, Iterator, Tuple
+
+import pandas as pd
+
+CSV_FIELDS = ["row", "user_id", "portfolio", "expected_return", "volatility", "max_drawdown",
+              "years", "cagr", "sharpe", "rationale", "rebalancing", "rebalancing_num_rebalances",
+              "rebalancing_turnover", "rebalancing_total_cost", "rebalancing_cagr", "rebalancing_volatility",
+              "rebalancing_sharpe", "rebalancing_max_drawdown", "error"]
+REBALANCING_FIELDS = ["num_rebalances", "turnover", "total_cost", "cagr", "volatility", "sharpe", "max_drawdown"]
+
+
+def read_profile_rows(stream, input_format: str) -> Iterator[Any]:
+    """Yield raw profile rows one at a time from a CSV or JSONL byte stream
+
+    JSONL lines are yielded undecoded so a malformed line fails only its own row.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if input_format == "csv":
+        for row in csv.DictReader(text):
+            # Empty CSV cells fall back to the model defaults
+            yield {key: value for key, value in row.items() if value not in ("", None)}
+    elif input_format == "jsonl":
+        for line in text:
+            if line.strip():
+                yield line
+    else:
+        raise ValueError(f"Unsupported input format: {input_format}")
+
+
+class PriceSnapshot:
+    """Prices shared by every row of a bulk run, downloaded at most once per ticker"""
+
+    def __init__(self, fetch_prices: Callable[[List[str]], pd.DataFrame]):
+        self.fetch_prices = fetch_prices
+        self.prices = pd.DataFrame()
+
+    def get(self, tickers: List[str]) -> pd.DataFrame:
+        """Aligned prices for the given tickers, fetching only the ones not seen yet"""
+        missing = [t for t in tickers if t not in self.prices.columns]
+        if missing:
+            fetched = self.fetch_prices(missing)
+            if isinstance(fetched, pd.Series):
+                fetched = fetched.to_frame(name=missing[0])
+            self.prices = fetched if self.prices.empty else self.prices.join(fetched, how="outer")
+        # Frames fetched at different times can end on different dates; a row with any ticker
+        # missing would count that ticker as zero in the portfolio value, so keep full rows only
+        return self.prices[tickers].dropna(how="any")
+
+
+class BulkRecommendationPipeline:
+    """Streams recommendations for many profiles, computing each distinct portfolio once"""
+
+    def __init__(self, profile_model, weights_fn: Callable, metrics_fn: Callable,
+                 rationale_fn: Callable, fetch_prices: Callable[[List[str]], pd.DataFrame],
+                 rebalancing_fn: Callable):
+        self.profile_model = profile_model
+        self.weights_fn = weights_fn
+        self.metrics_fn = metrics_fn
+        self.rationale_fn = rationale_fn
+        self.rebalancing_fn = rebalancing_fn
+        self.snapshot = PriceSnapshot(fetch_prices)
+        # The caches are bounded by the number of distinct portfolios, policies and
+        # profile buckets, not by the number of rows in the file
+        self._metrics = {}
+        self._rationales = {}
+        self._rebalancing = {}
+        self.stats = {"rows": 0, "succeeded": 0, "failed": 0}
+
+    def _portfolio_metrics(self, weights: Dict[str, float]) -> Tuple[Tuple, Dict[str, float]]:
+        """Metrics for a portfolio, computed the first time it is seen"""
+        key = tuple(sorted(weights.items()))
+        if key not in self._metrics:
+            data = self.snapshot.get(list(weights.keys()))
+            self._metrics[key] = self.metrics_fn(data, weights)
+        return key, self._metrics[key]
+
+    def _rebalancing_metrics(self, key: Tuple, weights: Dict[str, float], policy: str,
+                             cost_bps: float) -> Dict[str, Any]:
+        """Metrics of a portfolio under a rebalancing policy, computed once per policy and cost"""
+        cache_key = (key, policy, cost_bps)
+        if cache_key not in self._rebalancing:
+            data = self.snapshot.get(list(weights.keys()))
+            # An unsupported policy raises ValueError here and fails only its own row
+            self._rebalancing[cache_key] = self.rebalancing_fn(data, weights, [policy], cost_bps)[0]
+        return self._rebalancing[cache_key]
+
+    def _rationale(self, key: Tuple, profile, weights, metrics) -> List[str]:
+        """Rationale for a portfolio and the profile fields it depends on"""
+        cache_key = (key, profile.risk_score, profile.diversification, profile.horizon_years)
+        if cache_key not in self._rationales:
+            self._rationales[cache_key] = self.rationale_fn(profile, weights, metrics)
+        return self._rationales[cache_key]
+
+    def recommend(self, index: int, row) -> Dict[str, Any]:
+        """Recommendation for one raw row, or the error that prevented it"""
+        try:
+            if isinstance(row, str):
+                row = json.loads(row)
+            profile = self.profile_model(**row)
+            if not 1 <= profile.risk_score <= 10:
+                raise ValueError("Risk score must be between 1 and 10")
+            weights = self.weights_fn(profile)
+            key, metrics = self._portfolio_metrics(weights)
+            rebalancing = self._rebalancing_metrics(key, weights, profile.rebalancing, profile.transaction_cost_bps)
+            rationale = self._rationale(key, profile, weights, metrics)
+        except Exception as e:
+            self.stats["failed"] += 1
+            user_id = row.get("user_id") if isinstance(row, dict) else None
+            return {"row": index, "user_id": user_id, "error": str(e)}
+
+        self.stats["succeeded"] += 1
+        return {
+            "row": index,
+            "user_id": profile.user_id,
+            "portfolio": [{"ticker": t, "weight": w} for t, w in weights.items()],
+            "expected_return": metrics["expected_return"],
+            "volatility": metrics["volatility"],
+            "max_drawdown": metrics["max_drawdown"],
+            "backtest": {
+                "years": metrics["years"],
+                "cagr": metrics["cagr"],
+                "sharpe": metrics["sharpe"]
+            },
+            "rationale": rationale,
+            "rebalancing": rebalancing
+        }
+
+    def run(self, rows: Iterator[Any]) -> Iterator[Dict[str, Any]]:
+        """Yield one result per input row as soon as it is ready"""
+        start = time.perf_counter()
+        for index, row in enumerate(rows, start=1):
+            self.stats["rows"] += 1
+            yield self.recommend(index, row)
+        self.stats["elapsed_seconds"] = time.perf_counter() - start
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals for the run, including throughput in rows per second"""
+        elapsed = self.stats.get("elapsed_seconds", 0.0)
+        return {
+            **self.stats,
+            "distinct_portfolios": len(self._metrics),
+            "tickers_fetched": len(self.snapshot.prices.columns),
+            "rows_per_second": round(self.stats["rows"] / elapsed, 1) if elapsed > 0 else None
+        }
+
+
+def stream_ndjson(pipeline: BulkRecommendationPipeline, rows: Iterator[Any]) -> Iterator[str]:
+    """One JSON object per line, followed by a summary line"""
+    for result in pipeline.run(rows):
+        yield json.dumps(result) + "\n"
+    yield json.dumps({"summary": pipeline.summary()}) + "\n"
+
+
+def stream_csv(pipeline: BulkRecommendationPipeline, rows: Iterator[Any]) -> Iterator[str]:
+    """One CSV row per profile, followed by the summary as a trailing comment line"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+
+    for result in pipeline.run(rows):
+        if "error" in result:
+            writer.writerow({"row": result["row"], "user_id": result["user_id"], "error": result["error"]})
+        else:
+            writer.writerow({
+                "row": result["row"],
+                "user_id": result["user_id"],
+                "portfolio": ";".join(f"{a['ticker']}:{a['weight']}" for a in result["portfolio"]),
+                "expected_return": result["expected_return"],
+                "volatility": result["volatility"],
+                "max_drawdown": result["max_drawdown"],
+                "years": result["backtest"]["years"],
+                "cagr": result["backtest"]["cagr"],
+                "sharpe": result["backtest"]["sharpe"],
+                "rationale": " | ".join(result["rationale"]),
+                "rebalancing": result["rebalancing"]["policy"],
+                **{f"rebalancing_{field}": result["rebalancing"][field] for field in REBALANCING_FIELDS}
+            })
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    yield f"# summary: {json.dumps(pipeline.summary())}\n"
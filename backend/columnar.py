@@ -0,0 +1,191 @@
+import gzip
+import json
+import math
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import Response
+
+# Optional binary encoders; a format is only offered when its library is installed
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+MSGPACK = "application/x-msgpack"
+JSON = "application/json"
+
+MEDIA_TYPES = {
+    ARROW_STREAM: "arrow",
+    ARROW_FILE: "arrow_file",
+    MSGPACK: "msgpack",
+    "application/msgpack": "msgpack",
+    JSON: "json",
+}
+
+# Strategy frame columns exposed in the binary formats, with their output names and dtypes
+STRATEGY_COLUMNS = [
+    ("Close", "close", np.float64),
+    ("Probability", "probability", np.float64),
+    ("Signal", "signal", np.int8),
+    ("Position", "position", np.int8),
+    ("Strategy_Return", "strategy_return", np.float64),
+    ("Portfolio_Value", "portfolio_value", np.float64),
+    ("Buy_Hold_Value", "buy_hold_value", np.float64),
+]
+
+
+def available_formats() -> Dict[str, bool]:
+    """Which response formats can be produced in this environment"""
+    return {"json": True, "arrow": pa is not None, "arrow_file": pa is not None, "msgpack": msgpack is not None}
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Pick the response format from an Accept header, falling back to JSON"""
+    if not accept:
+        return "json"
+
+    available = available_formats()
+    best, best_q = "json", 0.0
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        fmt = MEDIA_TYPES.get(media_type.strip().lower())
+        if fmt is None or not available[fmt]:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        # Earlier entries win ties, so the client's listing order is respected
+        if q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
+def _column(data: pd.DataFrame, name: str, dtype) -> np.ndarray:
+    """Extract one column as a contiguous 1-D array"""
+    values = data[name].to_numpy()
+    if values.ndim > 1:
+        values = values[:, 0]
+    if np.issubdtype(np.dtype(dtype), np.integer):
+        values = np.nan_to_num(values.astype(np.float64), nan=0.0)
+    return np.ascontiguousarray(values, dtype=dtype)
+
+
+def strategy_columns(data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Equity curves, positions and the trade ledger of a backtested strategy as arrays
+
+    The `trade` column marks the rows of the trade ledger built by `backtest`:
+    1 for a buy, -1 for a sell and 0 where the position did not change.
+    """
+    columns = {"date": np.ascontiguousarray(data.index.values.astype("datetime64[ns]"))}
+    for source, name, dtype in STRATEGY_COLUMNS:
+        columns[name] = _column(data, source, dtype)
+
+    # Mirrors the ledger in `backtest`, where the undefined first change counts as a sell
+    position = data["Position"].to_numpy(dtype=np.float64).reshape(len(data), -1)[:, 0]
+    change = np.diff(position, prepend=np.nan)
+    trade = np.where(change > 0, 1, np.where(change != 0, -1, 0))
+    columns["trade"] = trade.astype(np.int8)
+    return columns
+
+
+def _json_default(value):
+    """Convert NumPy scalars and arrays for JSON and msgpack metadata"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _finite(value):
+    """Replace NaN and infinite floats with None, which JSON can represent"""
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return _finite(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def to_arrow_ipc(columns: Dict[str, np.ndarray], metadata: Dict[str, Any],
+                 compression: Optional[str] = "zstd", file_format: bool = False) -> bytes:
+    """Serialize columns to an Arrow IPC stream (or file), with metadata in the schema"""
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    if compression and not pa.Codec.is_available(compression):
+        compression = None
+
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    table = table.replace_schema_metadata(
+        {key: json.dumps(_finite(value), default=_json_default, allow_nan=False)
+         for key, value in metadata.items()}
+    )
+
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    new_writer = pa.ipc.new_file if file_format else pa.ipc.new_stream
+    with new_writer(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_msgpack(columns: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> bytes:
+    """Serialize columns as raw array buffers inside a msgpack map"""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+
+    payload = dict(metadata)
+    payload["columns"] = {
+        name: {"dtype": values.dtype.str, "shape": list(values.shape), "data": values.tobytes()}
+        for name, values in columns.items()
+    }
+    return msgpack.packb(payload, default=_json_default)
+
+
+def from_msgpack(content: bytes) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Decode a msgpack payload produced by `to_msgpack` back into arrays"""
+    payload = msgpack.unpackb(content)
+    columns = {
+        name: np.frombuffer(col["data"], dtype=np.dtype(col["dtype"])).reshape(col["shape"])
+        for name, col in payload.pop("columns").items()
+    }
+    return columns, payload
+
+
+def columnar_response(fmt: str, columns: Dict[str, np.ndarray], metadata: Dict[str, Any],
+                      accept_encoding: Optional[str] = None) -> Response:
+    """Build a binary response in the negotiated format"""
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if fmt == "arrow":
+        # Arrow compresses its own buffers, so no HTTP content encoding is added
+        return Response(content=to_arrow_ipc(columns, metadata), media_type=ARROW_STREAM, headers=headers)
+    elif fmt == "arrow_file":
+        return Response(content=to_arrow_ipc(columns, metadata, file_format=True), media_type=ARROW_FILE,
+                        headers=headers)
+    elif fmt == "msgpack":
+        content = to_msgpack(columns, metadata)
+        if accept_encoding and "gzip" in accept_encoding.lower():
+            content = gzip.compress(content, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=content, media_type=MSGPACK, headers=headers)
+    else:
+        raise ValueError(f"Unsupported columnar format: {fmt}")
@@ -0,0 +1,245 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy.special import expit
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+# Samples scored together by the forest evaluator, bounding its (trees x samples) work arrays
+_FOREST_BLOCK = 1024
+# Steps between dropping paths that have reached a leaf
+_COMPACT_EVERY = 4
+
+# Before 1.4 scikit-learn stored class counts in tree leaves and normalized them per call
+_LEAVES_HOLD_COUNTS = tuple(int(p) for p in sklearn.__version__.split(".")[:2]) < (1, 4)
+
+
+class CompiledModel(ABC):
+    """Base class of models compiled to flat NumPy arrays, with the predict API of scikit-learn"""
+
+    kind = None
+    array_names = ()
+
+    def __init__(self, classes: np.ndarray, n_features: int, feature_names: Optional[List[str]] = None):
+        self.classes_ = np.asarray(classes)
+        self.n_features = n_features
+        self.feature_names = feature_names
+
+    def _prepare(self, X, dtype) -> np.ndarray:
+        """Order DataFrame columns as in training and convert to an array of `dtype`
+
+        The memory layout is kept, as scikit-learn keeps it, so matrix products take the
+        same BLAS path and round identically.
+        """
+        if isinstance(X, pd.DataFrame) and self.feature_names is not None:
+            X = X[self.feature_names]
+        X = np.asarray(X, dtype=dtype)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n_samples, {self.n_features}), got {X.shape}")
+        return X
+
+    @abstractmethod
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities, identical to the source model's predict_proba"""
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def _meta(self) -> Dict[str, Any]:
+        return {
+            "format_version": FORMAT_VERSION,
+            "kind": self.kind,
+            "classes": self.classes_.tolist(),
+            "n_features": self.n_features,
+            "feature_names": self.feature_names
+        }
+
+    def save(self, path: str):
+        """Write the arrays as .npy files plus a meta.json into the directory `path`"""
+        os.makedirs(path, exist_ok=True)
+        for name in self.array_names:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump(self._meta(), f, indent=2)
+
+
+class CompiledForest(CompiledModel):
+    """A random forest as one set of node arrays covering every tree
+
+    `children` interleaves each node's left and right child, and leaves point to
+    themselves, so every (tree, sample) path advances with the same few array lookups.
+    """
+
+    kind = "random_forest"
+    array_names = ("feature", "threshold", "children", "is_leaf", "missing_left", "leaf_values", "roots")
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray, is_leaf: np.ndarray,
+                 missing_left: np.ndarray, leaf_values: np.ndarray, roots: np.ndarray, depth: int,
+                 classes: np.ndarray, n_features: int, feature_names: Optional[List[str]] = None):
+        super().__init__(classes, n_features, feature_names)
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.is_leaf = is_leaf
+        self.missing_left = missing_left
+        self.leaf_values = leaf_values
+        self.roots = roots
+        self.depth = depth
+
+    @classmethod
+    def from_sklearn(cls, model: RandomForestClassifier) -> "CompiledForest":
+        if model.n_outputs_ != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        features, thresholds, children, leaves, missing, values, roots = [], [], [], [], [], [], []
+        offset, depth = 0, 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(np.stack([np.where(is_leaf, nodes, tree.children_left),
+                                      np.where(is_leaf, nodes, tree.children_right)], axis=1).reshape(-1) + offset)
+            leaves.append(is_leaf)
+            missing.append(np.asarray(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)), dtype=bool))
+
+            # The class probabilities each tree's predict_proba returns for a leaf
+            value = tree.value[:, 0, :model.n_classes_]
+            if _LEAVES_HOLD_COUNTS:
+                normalizer = value.sum(axis=1, keepdims=True)
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+
+            offset += tree.node_count
+            depth = max(depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.intp),
+            is_leaf=np.concatenate(leaves),
+            missing_left=np.concatenate(missing),
+            leaf_values=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.array(roots, dtype=np.intp),
+            depth=int(depth),
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+            feature_names=_feature_names(model)
+        )
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Average of the trees' leaf probabilities, bit-for-bit as scikit-learn computes it"""
+        # Trees split on float32 features compared against float64 thresholds
+        X = np.ascontiguousarray(self._prepare(X, np.float32))
+        n_trees = len(self.roots)
+        proba = np.empty((len(X), self.leaf_values.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), _FOREST_BLOCK):
+            block = X[start:start + _FOREST_BLOCK]
+            n_rows = len(block)
+            values = block.reshape(-1)
+            has_missing = np.isnan(values).any()
+
+            # One path per (tree, sample), tree-major; `active` holds those not yet at a leaf
+            node = np.repeat(self.roots, n_rows)
+            active = np.arange(len(node))
+            current = node.copy()
+            row_offset = np.tile(np.arange(n_rows) * self.n_features, n_trees)
+            for step in range(self.depth):
+                if step % _COMPACT_EVERY == 0:
+                    node[active] = current
+                    keep = ~self.is_leaf.take(current)
+                    active, current, row_offset = active[keep], current[keep], row_offset[keep]
+                    if not len(active):
+                        break
+                x = values.take(row_offset + self.feature.take(current))
+                go_left = x <= self.threshold.take(current)
+                if has_missing:
+                    go_left |= np.isnan(x) & self.missing_left.take(current)
+                current = self.children.take(2 * current + ~go_left)
+            node[active] = current
+
+            # Summing over the leading (tree) axis adds the trees in order, as the forest does
+            proba[start:start + n_rows] = self.leaf_values[node.reshape(n_trees, n_rows)].sum(axis=0)
+        proba /= n_trees
+        return proba
+
+    def _meta(self) -> Dict[str, Any]:
+        return dict(super()._meta(), depth=self.depth, n_trees=len(self.roots), n_nodes=len(self.feature))
+
+
+class CompiledLogistic(CompiledModel):
+    """A binary logistic regression as its coefficient row and intercept"""
+
+    kind = "logistic_regression"
+    array_names = ("coef", "intercept")
+
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray, classes: np.ndarray,
+                 n_features: int, feature_names: Optional[List[str]] = None):
+        super().__init__(classes, n_features, feature_names)
+        self.coef = coef
+        self.intercept = intercept
+
+    @classmethod
+    def from_sklearn(cls, model: LogisticRegression) -> "CompiledLogistic":
+        if len(model.classes_) != 2:
+            raise ValueError("Only binary logistic regression can be compiled")
+        return cls(
+            coef=np.ascontiguousarray(model.coef_, dtype=np.float64),
+            intercept=np.ascontiguousarray(model.intercept_, dtype=np.float64),
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+            feature_names=_feature_names(model)
+        )
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = self._prepare(X, np.float64)
+        probability = expit((X @ self.coef.T + self.intercept).reshape(-1))
+        return np.stack([1 - probability, probability], axis=1)
+
+
+COMPILED_MODELS = {
+    CompiledForest.kind: CompiledForest,
+    CompiledLogistic.kind: CompiledLogistic,
+}
+
+
+def _feature_names(model) -> Optional[List[str]]:
+    names = getattr(model, "feature_names_in_", None)
+    return None if names is None else [str(name) for name in names]
+
+
+def compile_model(model) -> CompiledModel:
+    """Convert a fitted strategy model into flat arrays with a vectorized evaluator"""
+    if isinstance(model, RandomForestClassifier):
+        return CompiledForest.from_sklearn(model)
+    if isinstance(model, LogisticRegression):
+        return CompiledLogistic.from_sklearn(model)
+    raise ValueError(f"Cannot compile model of type {type(model).__name__}")
+
+
+def load_compiled_model(path: str, mmap_mode: Optional[str] = "r") -> CompiledModel:
+    """Load a model saved with `CompiledModel.save`, memory-mapping its arrays by default"""
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled model format: {meta.get('format_version')}")
+    if meta["kind"] not in COMPILED_MODELS:
+        raise ValueError(f"Unknown compiled model kind: {meta['kind']}")
+
+    model_cls = COMPILED_MODELS[meta["kind"]]
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+              for name in model_cls.array_names}
+    kwargs = {"depth": meta["depth"]} if model_cls is CompiledForest else {}
+    return model_cls(classes=np.array(meta["classes"]), n_features=meta["n_features"],
+                     feature_names=meta["feature_names"], **arrays, **kwargs)
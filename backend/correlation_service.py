@@ -0,0 +1,244 @@
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+
+DEFAULT_UNIVERSE = ["SPY", "QQQ", "EFA", "AGG"]
+STATE_VERSION = 1
+
+
+class OnlineCovariance:
+    """Welford-style running mean and covariance over the full history"""
+
+    def __init__(self, n_assets: int):
+        self.count = 0
+        self.mean = np.zeros(n_assets)
+        self.m2 = np.zeros((n_assets, n_assets))
+
+    def update(self, x: np.ndarray):
+        """Fold one vector of returns into the state in O(N^2)"""
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += np.outer(delta, x - self.mean)
+
+    def covariance(self) -> np.ndarray:
+        """Sample covariance of everything seen so far"""
+        if self.count < 2:
+            raise ValueError("At least two observations are needed for a covariance")
+        return self.m2 / (self.count - 1)
+
+
+class EWCovariance:
+    """Exponentially weighted running mean and covariance"""
+
+    def __init__(self, n_assets: int, halflife: float = 63):
+        self.alpha = 1 - math.exp(math.log(0.5) / halflife)
+        self.count = 0
+        self.mean = np.zeros(n_assets)
+        self.cov = np.zeros((n_assets, n_assets))
+
+    def update(self, x: np.ndarray):
+        """Fold one vector of returns into the state in O(N^2)"""
+        self.count += 1
+        if self.count == 1:
+            self.mean[:] = x
+            return
+        delta = x - self.mean
+        self.mean += self.alpha * delta
+        self.cov = (1 - self.alpha) * (self.cov + self.alpha * np.outer(delta, delta))
+
+    def covariance(self) -> np.ndarray:
+        """Current exponentially weighted covariance"""
+        if self.count < 2:
+            raise ValueError("At least two observations are needed for a covariance")
+        return self.cov
+
+
+def covariance_to_correlation(cov: np.ndarray) -> np.ndarray:
+    """Scale a covariance matrix to a correlation matrix"""
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(std, std)
+    corr = np.clip(np.nan_to_num(corr), -1.0, 1.0)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+def clustered_order(corr: np.ndarray) -> List[int]:
+    """Order assets so that correlated ones sit next to each other (hierarchical clustering)"""
+    if len(corr) < 3:
+        return list(range(len(corr)))
+    distance = np.sqrt(np.clip(0.5 * (1 - corr), 0.0, None))
+    np.fill_diagonal(distance, 0.0)
+    return leaves_list(linkage(squareform(distance, checks=False), method="single")).tolist()
+
+
+class CorrelationService:
+    """Incremental covariance and correlation state for a ticker universe"""
+
+    def __init__(self, universe: List[str], fetch_prices: Callable[[List[str], Optional[str]], pd.DataFrame],
+                 state_path: Optional[str] = None, halflife: float = 63, refresh_interval: float = 3600):
+        self.universe = list(universe)
+        self.fetch_prices = fetch_prices
+        self.state_path = state_path
+        self.halflife = halflife
+        self.refresh_interval = refresh_interval
+        # `_lock` guards the covariance state; `_refresh_lock` lets one refresh fetch at a time
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._reset()
+        if state_path and os.path.exists(state_path):
+            self.load(state_path)
+
+    def _reset(self):
+        """Start from an empty state"""
+        n = len(self.universe)
+        self.full = OnlineCovariance(n)
+        self.ewm = EWCovariance(n, self.halflife)
+        self.last_prices = None
+        self.last_date = None
+
+    def update_bar(self, date, prices: np.ndarray) -> bool:
+        """Apply one bar of universe prices; bars with missing prices are skipped"""
+        prices = np.asarray(prices, dtype=float)
+        if prices.shape != (len(self.universe),) or not np.all(np.isfinite(prices)) or np.any(prices <= 0):
+            return False
+        if self.last_date is not None and pd.Timestamp(date) <= self.last_date:
+            return False
+
+        if self.last_prices is not None:
+            returns = prices / self.last_prices - 1
+            self.full.update(returns)
+            self.ewm.update(returns)
+        self.last_prices = prices
+        self.last_date = pd.Timestamp(date)
+        return True
+
+    def update_frame(self, prices: pd.DataFrame) -> int:
+        """Apply every bar of a (date x ticker) price frame in order"""
+        values = prices.reindex(columns=self.universe).to_numpy(dtype=float)
+        applied = 0
+        with self._lock:
+            for date, row in zip(prices.index, values):
+                applied += self.update_bar(date, row)
+        return applied
+
+    def refresh(self, force: bool = False) -> int:
+        """Pull bars newer than the state and persist it, at most once per refresh interval"""
+        with self._refresh_lock:
+            if not force and time.time() - self._last_refresh < self.refresh_interval:
+                return 0
+            with self._lock:
+                last_date = self.last_date
+            start = None
+            if last_date is not None:
+                start = (last_date + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+            # Readers keep using the current state while the bars are downloaded
+            prices = self.fetch_prices(self.universe, start)
+            applied = 0
+            if prices is not None and not prices.empty:
+                applied = self.update_frame(self._settled_bars(prices))
+            self._last_refresh = time.time()
+            if applied and self.state_path:
+                with self._lock:
+                    self.save(self.state_path)
+            return applied
+
+    @staticmethod
+    def _settled_bars(prices: pd.DataFrame) -> pd.DataFrame:
+        """Bars that can no longer change: before today, and followed by a newer bar
+
+        Applied bars are never replayed, so an in-progress bar (today's, or the latest one
+        while the market is open) would leave its intraday price in the state for good.
+        It is held back and fetched again by the next refresh instead.
+        """
+        prices = prices.iloc[:-1]
+        return prices[prices.index < pd.Timestamp.today().normalize()]
+
+    def _state(self, kind: str):
+        """Covariance state for 'full' history or 'ewm' weighting"""
+        if kind == "full":
+            return self.full
+        elif kind == "ewm":
+            return self.ewm
+        raise ValueError(f"Unsupported covariance kind: {kind}")
+
+    def _snapshot(self, kind: str):
+        """Covariance, observation count and last date, read together under the lock"""
+        with self._lock:
+            state = self._state(kind)
+            return state.covariance().copy(), state.count, self.last_date
+
+    def correlation_matrix(self, kind: str = "full", clustered: bool = False) -> Dict[str, Any]:
+        """Correlation matrix of the universe, optionally in clustered order"""
+        cov, count, last_date = self._snapshot(kind)
+        corr = covariance_to_correlation(cov)
+        order = clustered_order(corr) if clustered else list(range(len(self.universe)))
+        corr = corr[np.ix_(order, order)]
+        return {
+            "kind": kind,
+            "tickers": [self.universe[i] for i in order],
+            "matrix": np.round(corr, 4).tolist(),
+            "observations": count,
+            "as_of": last_date.strftime("%Y-%m-%d") if last_date is not None else None
+        }
+
+    def diversification_ratio(self, weights: Dict[str, float], kind: str = "full") -> float:
+        """Weighted average volatility divided by portfolio volatility"""
+        missing = [t for t in weights if t not in self.universe]
+        if missing:
+            raise ValueError(f"Tickers not in the correlation universe: {', '.join(missing)}")
+
+        idx = [self.universe.index(t) for t in weights]
+        w = np.array(list(weights.values()), dtype=float)
+        cov = self._snapshot(kind)[0][np.ix_(idx, idx)]
+        portfolio_vol = math.sqrt(max(w @ cov @ w, 0.0))
+        if portfolio_vol == 0:
+            raise ValueError("Portfolio volatility is zero")
+        return float(w @ np.sqrt(np.diag(cov)) / portfolio_vol)
+
+    def save(self, path: str):
+        """Persist the state atomically so a restart does not replay history"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=STATE_VERSION,
+                universe=np.array(self.universe),
+                halflife=self.halflife,
+                full_count=self.full.count,
+                full_mean=self.full.mean,
+                full_m2=self.full.m2,
+                ewm_count=self.ewm.count,
+                ewm_mean=self.ewm.mean,
+                ewm_cov=self.ewm.cov,
+                last_prices=self.last_prices if self.last_prices is not None else np.array([]),
+                last_date=np.datetime64(self.last_date) if self.last_date is not None else np.datetime64("NaT")
+            )
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """Restore persisted state; a state for a different universe or halflife is ignored"""
+        with np.load(path, allow_pickle=False) as state:
+            if (int(state["version"]) != STATE_VERSION
+                    or state["universe"].tolist() != self.universe
+                    or float(state["halflife"]) != self.halflife):
+                return False
+            self.full.count = int(state["full_count"])
+            self.full.mean = state["full_mean"].copy()
+            self.full.m2 = state["full_m2"].copy()
+            self.ewm.count = int(state["ewm_count"])
+            self.ewm.mean = state["ewm_mean"].copy()
+            self.ewm.cov = state["ewm_cov"].copy()
+            self.last_prices = state["last_prices"].copy() if state["last_prices"].size else None
+            last_date = state["last_date"][()]
+            self.last_date = None if np.isnat(last_date) else pd.Timestamp(last_date)
+        return True
@@ -0,0 +1,154 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+import numpy as np
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import TimeSeriesSplit
+
+from models import build_model, SUPPORTED_MODELS
+from shared_memory_utils import SharedArrays, attach_worker_arrays, release_worker_arrays, worker_arrays, pool_size
+
+CV_METHODS = ('purged_kfold', 'time_series')
+
+def purged_kfold_splits(n_samples: int, n_splits: int = 5, purge: int = 1,
+                        embargo: int = 0) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Contiguous K-fold splits with purging before and an embargo after each test fold"""
+    if n_splits < 2 or n_splits > n_samples:
+        raise ValueError(f"n_splits must be between 2 and {n_samples}")
+
+    indices = np.arange(n_samples)
+    for test in np.array_split(indices, n_splits):
+        start, stop = test[0], test[-1] + 1
+        # Drop training samples whose labels overlap the test fold (purge)
+        # and the samples right after it that leak through serial correlation (embargo)
+        train_mask = np.ones(n_samples, dtype=bool)
+        train_mask[max(0, start - purge):min(n_samples, stop + embargo)] = False
+        yield indices[train_mask], test
+
+
+def time_series_splits(n_samples: int, n_splits: int = 5,
+                       purge: int = 1) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Expanding-window splits, with a gap of `purge` samples before each test fold"""
+    return TimeSeriesSplit(n_splits=n_splits, gap=purge).split(np.zeros((n_samples, 1)))
+
+
+def _run_fold(fold: int, train_idx: np.ndarray, test_idx: np.ndarray, model_type: str,
+              random_state: int, model_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Fit and score one fold against the shared arrays"""
+    X = worker_arrays['X']
+    y = worker_arrays['y']
+
+    # CPU time is unaffected by workers competing for cores, unlike wall time
+    start, cpu_start = time.perf_counter(), time.process_time()
+    model = build_model(model_type, random_state=random_state, **model_params)
+    model.fit(X[train_idx], y[train_idx])
+    y_pred = model.predict(X[test_idx])
+    elapsed, cpu_elapsed = time.perf_counter() - start, time.process_time() - cpu_start
+
+    return {
+        'fold': fold,
+        'train_size': int(len(train_idx)),
+        'test_size': int(len(test_idx)),
+        'test_start': int(test_idx[0]),
+        'test_end': int(test_idx[-1]),
+        'accuracy': float(accuracy_score(y[test_idx], y_pred)),
+        'classification_report': classification_report(y[test_idx], y_pred, output_dict=True, zero_division=0),
+        'fit_seconds': elapsed,
+        'fit_cpu_seconds': cpu_elapsed
+    }
+
+
+def _average_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Average classification reports fold by fold, over the folds where each entry appears"""
+    totals = {}
+    counts = {}
+    for report in reports:
+        for label, entry in report.items():
+            if isinstance(entry, dict):
+                bucket = totals.setdefault(label, {})
+                seen = counts.setdefault(label, {})
+                for metric, value in entry.items():
+                    bucket[metric] = bucket.get(metric, 0.0) + value
+                    seen[metric] = seen.get(metric, 0) + 1
+            else:
+                totals[label] = totals.get(label, 0.0) + entry
+                counts[label] = counts.get(label, 0) + 1
+
+    averaged = {}
+    for label, entry in totals.items():
+        if isinstance(entry, dict):
+            averaged[label] = {metric: value / counts[label][metric] for metric, value in entry.items()}
+        else:
+            averaged[label] = entry / counts[label]
+    return averaged
+
+
+def cross_validate(X: np.ndarray, y: np.ndarray, model_type: str = 'random_forest',
+                   method: str = 'purged_kfold', n_splits: int = 5, purge: int = 1,
+                   embargo: float = 0.01, random_state: int = 42,
+                   n_workers: Optional[int] = None,
+                   model_params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Run time-ordered cross-validation with the folds spread over a process pool"""
+    if method not in CV_METHODS:
+        raise ValueError(f"Unsupported cross-validation method: {method}")
+    if model_type not in SUPPORTED_MODELS:
+        raise ValueError(f"Unsupported model type: {model_type}")
+
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.int64)
+    n_samples = len(y)
+    model_params = model_params or {}
+    embargo_size = int(math.ceil(n_samples * embargo))
+
+    if method == 'purged_kfold':
+        splits = list(purged_kfold_splits(n_samples, n_splits, purge=purge, embargo=embargo_size))
+    else:
+        splits = list(time_series_splits(n_samples, n_splits, purge=purge))
+
+    pool = pool_size(n_workers, len(splits))
+    n_workers = pool['n_workers']
+
+    start = time.perf_counter()
+    with SharedArrays(X=X, y=y) as specs:
+        if n_workers == 1:
+            attach_worker_arrays(specs)
+            try:
+                folds = [_run_fold(i, train, test, model_type, random_state, model_params)
+                         for i, (train, test) in enumerate(splits)]
+            finally:
+                release_worker_arrays()
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=attach_worker_arrays,
+                                     initargs=(specs,)) as pool:
+                futures = [pool.submit(_run_fold, i, train, test, model_type, random_state, model_params)
+                           for i, (train, test) in enumerate(splits)]
+                folds = [future.result() for future in futures]
+    wall_seconds = time.perf_counter() - start
+
+    accuracies = [fold['accuracy'] for fold in folds]
+    fold_cpu_seconds = sum(fold['fit_cpu_seconds'] for fold in folds)
+    # Speedup over running the same folds serially, measured as total CPU time over wall time
+    speedup = fold_cpu_seconds / wall_seconds if wall_seconds > 0 else 0.0
+
+    return {
+        'method': method,
+        'n_splits': len(folds),
+        'purge': purge,
+        'embargo': embargo_size if method == 'purged_kfold' else 0,
+        'folds': folds,
+        'accuracy': float(np.mean(accuracies)),
+        'accuracy_std': float(np.std(accuracies)),
+        'classification_report': _average_reports([fold['classification_report'] for fold in folds]),
+        'scaling': {
+            'n_workers': n_workers,
+            'requested_workers': pool['requested_workers'],
+            'cpu_count': pool['cpu_count'],
+            'oversubscribed': pool['oversubscribed'],
+            'wall_seconds': wall_seconds,
+            'fold_cpu_seconds': fold_cpu_seconds,
+            'speedup': speedup,
+            'efficiency': speedup / n_workers
+        }
+    }
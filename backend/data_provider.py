@@ -0,0 +1,91 @@
+import os
+import zlib
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+FIELDS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+PERIOD_YEARS = {"1y": 1, "2y": 2, "5y": 5, "10y": 10, "max": 30}
+
+
+class YahooDataProvider:
+    """Downloads price history from Yahoo Finance"""
+
+    def download(self, tickers: Union[str, List[str]], **kwargs) -> pd.DataFrame:
+        return yf.download(tickers, **kwargs)
+
+
+class SyntheticDataProvider:
+    """Deterministic random-walk price history shaped like `yf.download`, for offline use"""
+
+    def __init__(self, start: str = "1995-01-02", seed: int = 0):
+        self.start = pd.Timestamp(start)
+        self.seed = seed
+        self._cache: Dict[str, pd.DataFrame] = {}
+
+    def _history(self, ticker: str) -> pd.DataFrame:
+        """Full daily history for one ticker, generated once and cached"""
+        if ticker not in self._cache:
+            rng = np.random.default_rng(zlib.crc32(ticker.encode()) + self.seed)
+            index = pd.bdate_range(self.start, pd.Timestamp.today().normalize())
+            drift, vol = rng.uniform(0.0001, 0.0005), rng.uniform(0.005, 0.02)
+            close = 100 * np.exp(np.cumsum(rng.normal(drift, vol, len(index))))
+            spread = np.abs(rng.normal(0, vol, len(index)))
+            self._cache[ticker] = pd.DataFrame({
+                "Open": close * (1 + rng.normal(0, vol / 4, len(index))),
+                "High": close * (1 + spread),
+                "Low": close * (1 - spread),
+                "Close": close,
+                "Adj Close": close,
+                "Volume": rng.integers(1_000_000, 50_000_000, len(index))
+            }, index=index)
+        return self._cache[ticker]
+
+    def download(self, tickers: Union[str, List[str]], start: Optional[str] = None,
+                 end: Optional[str] = None, period: Optional[str] = None, **kwargs) -> pd.DataFrame:
+        if period is not None and start is None:
+            start = pd.Timestamp.today().normalize() - pd.DateOffset(years=PERIOD_YEARS.get(period, 10))
+
+        frames = {}
+        for ticker in ([tickers] if isinstance(tickers, str) else tickers):
+            history = self._history(ticker)
+            frames[ticker] = history.loc[start:end] if start is not None or end is not None else history
+
+        if isinstance(tickers, str):
+            return frames[tickers].copy()
+        # Multiple tickers come back with (field, ticker) columns, as from yfinance
+        data = pd.concat(frames, axis=1).swaplevel(axis=1)
+        return data.reindex(columns=pd.MultiIndex.from_product([FIELDS, list(frames)]))
+
+
+def _default_provider():
+    """Provider named by DATA_PROVIDER: yahoo (default), synthetic or shared_cache"""
+    name = os.getenv("DATA_PROVIDER", "yahoo")
+    if name == "synthetic":
+        return SyntheticDataProvider()
+    if name == "shared_cache":
+        # Served from the shared-memory cache published by price_cache.py
+        from price_cache import SharedPriceCacheProvider
+        return SharedPriceCacheProvider(fallback=YahooDataProvider())
+    return YahooDataProvider()
+
+
+_provider = _default_provider()
+
+
+def set_data_provider(provider):
+    """Replace the provider used by every price download in the backend"""
+    global _provider
+    _provider = provider
+
+
+def get_data_provider():
+    """The provider currently used for price downloads"""
+    return _provider
+
+
+def download(tickers: Union[str, List[str]], **kwargs) -> pd.DataFrame:
+    """Download price history through the configured provider"""
+    return _provider.download(tickers, **kwargs)
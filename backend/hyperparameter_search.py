@@ -0,0 +1,238 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+from sklearn.metrics import accuracy_score
+
+from models import build_model
+from shared_memory_utils import SharedArrays, attach_worker_arrays, release_worker_arrays, worker_arrays, pool_size
+
+SEARCH_METHODS = ('successive_halving', 'hyperband')
+THRESHOLDS = [0.5, 0.55, 0.6, 0.65, 0.7]
+
+# Candidate values for each model's hyperparameters
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [3, 5, 8, 12, None],
+        'min_samples_split': [2, 10, 50],
+        'min_samples_leaf': [1, 5, 20, 50],
+    },
+    'logistic_regression': {
+        'C': [float(c) for c in np.logspace(-3, 2, 11)],
+    },
+}
+
+# Smallest training window a trial is given, in rows
+MIN_RESOURCE = 100
+
+
+def sample_configurations(model_type: str, n_configs: int, random_state: int = 42) -> List[Dict[str, Any]]:
+    """Draw distinct model parameter and threshold combinations from the search space"""
+    if model_type not in SEARCH_SPACES:
+        raise ValueError(f"Unsupported model type: {model_type}")
+
+    space = dict(SEARCH_SPACES[model_type], threshold=THRESHOLDS)
+    rng = np.random.default_rng(random_state)
+    n_total = math.prod(len(values) for values in space.values())
+
+    configs, seen = [], set()
+    while len(configs) < min(n_configs, n_total):
+        config = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        key = tuple(config.items())
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def validation_sharpe(signals: np.ndarray, next_return: np.ndarray, periods_per_year: int = 252) -> float:
+    """Sharpe ratio of trading the signals as `TradingStrategy.backtest` does"""
+    position = np.concatenate([[0], signals[:-1]])
+    returns = position * next_return
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    return float(np.sqrt(periods_per_year) * returns.mean() / std) if std > 0 else 0.0
+
+
+def _run_trial(trial_id: int, config: Dict[str, Any], model_type: str, resource: int,
+               train_end: int, val_start: int, random_state: int) -> Dict[str, Any]:
+    """Fit one configuration on the latest `resource` training rows and score it on validation"""
+    X = worker_arrays['X']
+    y = worker_arrays['y']
+    next_return = worker_arrays['next_return']
+
+    params = {k: v for k, v in config.items() if k != 'threshold'}
+    threshold = config['threshold']
+    train = slice(train_end - resource, train_end)
+    val = slice(val_start, len(y))
+
+    # CPU time is unaffected by workers competing for cores, unlike wall time
+    start = time.process_time()
+    model = build_model(model_type, random_state=random_state, **params)
+    model.fit(X[train], y[train])
+    probability = model.predict_proba(X[val])[:, 1]
+    elapsed = time.process_time() - start
+
+    signals = np.where(probability > threshold, 1, np.where(probability < 1 - threshold, -1, 0))
+    return {
+        'trial': trial_id,
+        'resource': resource,
+        'accuracy': float(accuracy_score(y[val], (probability > 0.5).astype(int))),
+        'sharpe': validation_sharpe(signals, next_return[val]),
+        'fit_cpu_seconds': elapsed
+    }
+
+
+class _TrialRunner:
+    """Runs batches of trials inline or on a process pool attached to the shared arrays"""
+
+    def __init__(self, pool: Optional[ProcessPoolExecutor], model_type: str, train_end: int,
+                 val_start: int, random_state: int):
+        self.pool = pool
+        self.model_type = model_type
+        self.train_end = train_end
+        self.val_start = val_start
+        self.random_state = random_state
+        self.trials = []
+
+    def run(self, configs: List[Dict[str, Any]], ids: List[int], resource: int) -> List[Dict[str, Any]]:
+        """Evaluate every configuration at the same resource level"""
+        args = [(i, c, self.model_type, resource, self.train_end, self.val_start, self.random_state)
+                for i, c in zip(ids, configs)]
+        if self.pool is None:
+            results = [_run_trial(*a) for a in args]
+        else:
+            results = [f.result() for f in [self.pool.submit(_run_trial, *a) for a in args]]
+        self.trials.extend(results)
+        return results
+
+
+def _successive_halving(runner: _TrialRunner, configs: List[Dict[str, Any]], ids: List[int],
+                        n_rungs: int, max_resource: int, eta: int, metric: str) -> Dict[str, Any]:
+    """Evaluate configurations at growing resource, keeping the best 1/eta at each rung
+
+    Rung k trains on max_resource / eta^(n_rungs - 1 - k) rows, so the last rung uses
+    the full training window.
+    """
+    rungs = []
+    for rung in range(n_rungs):
+        resource = max(MIN_RESOURCE, max_resource // eta ** (n_rungs - 1 - rung))
+        results = runner.run(configs, ids, resource)
+        ranked = sorted(zip(results, configs, ids), key=lambda item: item[0][metric], reverse=True)
+        rungs.append({
+            'resource': resource,
+            'configurations': len(configs),
+            'best_score': ranked[0][0][metric]
+        })
+        if len(configs) == 1:
+            break
+        keep = max(1, len(configs) // eta)
+        configs = [config for _, config, _ in ranked[:keep]]
+        ids = [i for _, _, i in ranked[:keep]]
+
+    best_result, best_config, _ = ranked[0]
+    return {'rungs': rungs, 'result': best_result, 'config': best_config}
+
+
+def search(X: np.ndarray, y: np.ndarray, next_return: np.ndarray, model_type: str = 'random_forest',
+           method: str = 'successive_halving', n_configs: int = 27, eta: int = 3,
+           metric: str = 'sharpe', validation_size: float = 0.2, purge: int = 1,
+           random_state: int = 42, n_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Search model hyperparameters and signal threshold with early stopping of weak configurations
+
+    The most recent `validation_size` of the history is held out for validation; trials
+    train on the latest rows before it, with `purge` rows dropped in between.
+    """
+    if method not in SEARCH_METHODS:
+        raise ValueError(f"Unsupported search method: {method}")
+    if metric not in ('sharpe', 'accuracy'):
+        raise ValueError(f"Unsupported search metric: {metric}")
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+
+    n_samples = len(y)
+    val_start = int(n_samples * (1 - validation_size))
+    train_end = val_start - purge
+    max_resource = train_end
+    if max_resource < MIN_RESOURCE:
+        raise ValueError(f"At least {MIN_RESOURCE} training rows are needed for a search")
+
+    pool_info = pool_size(n_workers, n_configs)
+    n_workers = pool_info['n_workers']
+    configs = sample_configurations(model_type, n_configs, random_state)
+    brackets = []
+
+    start = time.perf_counter()
+    arrays = {
+        'X': np.ascontiguousarray(X, dtype=np.float64),
+        'y': np.ascontiguousarray(y, dtype=np.int64),
+        'next_return': np.ascontiguousarray(next_return, dtype=np.float64)
+    }
+    with SharedArrays(**arrays) as specs:
+        pool = None
+        if n_workers == 1:
+            attach_worker_arrays(specs)
+        else:
+            pool = ProcessPoolExecutor(max_workers=n_workers, initializer=attach_worker_arrays, initargs=(specs,))
+        try:
+            runner = _TrialRunner(pool, model_type, train_end, val_start, random_state)
+            if method == 'successive_halving':
+                # Enough rungs to narrow the configurations down to one
+                n_rungs, remaining = 1, len(configs)
+                while remaining > 1:
+                    remaining = max(1, remaining // eta)
+                    n_rungs += 1
+                brackets.append(_successive_halving(runner, configs, list(range(len(configs))),
+                                                    n_rungs, max_resource, eta, metric))
+            else:
+                # Hyperband: trade off many cheap trials against few expensive ones
+                s_max = max(0, int(math.log(max_resource / MIN_RESOURCE, eta)))
+                offset = 0
+                for s in range(s_max, -1, -1):
+                    n = math.ceil((s_max + 1) / (s + 1) * eta ** s)
+                    bracket_configs = sample_configurations(model_type, n, random_state + s)
+                    ids = list(range(offset, offset + len(bracket_configs)))
+                    offset += len(bracket_configs)
+                    brackets.append(_successive_halving(runner, bracket_configs, ids,
+                                                        s + 1, max_resource, eta, metric))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            else:
+                release_worker_arrays()
+    wall_seconds = time.perf_counter() - start
+
+    best = max(brackets, key=lambda bracket: bracket['result'][metric])
+    trials = runner.trials
+    resource_units = sum(trial['resource'] for trial in trials)
+    params = {k: v for k, v in best['config'].items() if k != 'threshold'}
+
+    return {
+        'method': method,
+        'metric': metric,
+        'best': {
+            'model_type': model_type,
+            'params': params,
+            'threshold': best['config']['threshold'],
+            'score': best['result'][metric],
+            'accuracy': best['result']['accuracy'],
+            'sharpe': best['result']['sharpe'],
+            'resource': best['result']['resource']
+        },
+        'brackets': [{'rungs': bracket['rungs']} for bracket in brackets],
+        'budget': {
+            'configurations': sum(bracket['rungs'][0]['configurations'] for bracket in brackets),
+            'trials': len(trials),
+            'resource_units': resource_units,
+            'max_resource': max_resource,
+            'full_budget_equivalents': resource_units / max_resource,
+            'trial_cpu_seconds': sum(trial['fit_cpu_seconds'] for trial in trials),
+            'wall_seconds': wall_seconds,
+            'n_workers': n_workers,
+            'requested_workers': pool_info['requested_workers'],
+            'cpu_count': pool_info['cpu_count'],
+            'oversubscribed': pool_info['oversubscribed']
+        }
+    }
@@ -0,0 +1,314 @@
+import argparse
+import json
+import math
+import os
+import time
+from typing import Dict, List, Any, Iterator
+
+import numpy as np
+import pandas as pd
+
+from models import build_model
+from trading_strategy import add_features, FEATURES, FEATURE_LOOKBACK
+
+# Parquet support is optional; CSV bar files work without it
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+DEFAULT_CHUNKSIZE = 500_000
+MINUTE_BARS_PER_YEAR = 252 * 390
+
+
+def _normalize_chunk(chunk: pd.DataFrame, default_ticker: str, time_column: str,
+                     ticker_column: str, close_column: str) -> pd.DataFrame:
+    """Rename a raw chunk to ticker / timestamp / close columns"""
+    return pd.DataFrame({
+        'ticker': chunk[ticker_column].astype(str).to_numpy() if ticker_column in chunk else default_ticker,
+        'timestamp': pd.to_datetime(chunk[time_column]).to_numpy(),
+        'close': chunk[close_column].to_numpy(dtype=np.float64)
+    })
+
+
+def read_bar_chunks(paths: List[str], chunksize: int = DEFAULT_CHUNKSIZE, time_column: str = 'timestamp',
+                    ticker_column: str = 'ticker', close_column: str = 'close') -> Iterator[pd.DataFrame]:
+    """Yield bars from local CSV or Parquet files in chunks of at most `chunksize` rows
+
+    Bars must be in time order within each ticker. Files without a ticker column
+    are treated as a single ticker named after the file.
+    """
+    wanted = (time_column, ticker_column, close_column)
+    for path in paths:
+        default_ticker = os.path.splitext(os.path.basename(path))[0].upper()
+        if path.endswith('.parquet'):
+            if pq is None:
+                raise RuntimeError("pyarrow is required to read Parquet bar files")
+            parquet = pq.ParquetFile(path, memory_map=True)
+            columns = [c for c in wanted if c in parquet.schema_arrow.names]
+            raw_chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunksize, columns=columns))
+        else:
+            header = pd.read_csv(path, nrows=0).columns
+            columns = [c for c in wanted if c in header]
+            raw_chunks = pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+        for chunk in raw_chunks:
+            yield _normalize_chunk(chunk, default_ticker, time_column, ticker_column, close_column)
+
+
+class TickerBatch:
+    """The bars of one ticker within a chunk, with their features and signals"""
+    __slots__ = ('ticker', 'timestamps', 'closes', 'features', 'valid', 'signals')
+
+    def __init__(self, ticker, timestamps, closes, features, valid):
+        self.ticker = ticker
+        self.timestamps = timestamps
+        self.closes = closes
+        self.features = features
+        self.valid = valid
+        self.signals = None
+
+
+class TickerState:
+    """Bounded state carried between chunks for one ticker"""
+
+    def __init__(self):
+        # Indicator state: the last FEATURE_LOOKBACK closes
+        self.tail = np.empty(0)
+        # The latest bar, waiting for the next close to realize its return
+        self.pending = None
+        # Signal of the last realized bar, which becomes the next position
+        self.last_signal = None
+        self.position = None
+
+        # Streaming metric accumulators
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.strategy_value = 1.0
+        self.market_value = 1.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.num_trades = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+
+def feature_batches(chunks: Iterator[pd.DataFrame], states: Dict[str, TickerState]) -> Iterator[List[TickerBatch]]:
+    """Compute the strategy features chunk by chunk, continuing each ticker's indicators"""
+    for chunk in chunks:
+        batches = []
+        for ticker, group in chunk.groupby('ticker', sort=False):
+            state = states.setdefault(ticker, TickerState())
+            closes = group['close'].to_numpy()
+            history = np.concatenate([state.tail, closes])
+
+            frame = add_features(pd.DataFrame({'Close': history}))
+            features = frame[FEATURES].to_numpy()[len(state.tail):]
+            valid = ~np.isnan(features).any(axis=1)
+            state.tail = history[-FEATURE_LOOKBACK:].copy()
+
+            batches.append(TickerBatch(ticker, group['timestamp'].to_numpy(), closes, features[valid], valid))
+        yield batches
+
+
+def signal_batches(batches_iter: Iterator[List[TickerBatch]], model, threshold: float = 0.6) -> Iterator[List[TickerBatch]]:
+    """Score every valid bar of a chunk in one batched predict_proba call"""
+    for batches in batches_iter:
+        sizes = [len(batch.features) for batch in batches]
+        if sum(sizes):
+            probability = model.predict_proba(np.concatenate([b.features for b in batches]))[:, 1]
+            signals = np.where(probability > threshold, 1, np.where(probability < 1 - threshold, -1, 0))
+        else:
+            signals = np.empty(0, dtype=int)
+
+        offset = 0
+        for batch, size in zip(batches, sizes):
+            batch.signals = signals[offset:offset + size]
+            offset += size
+        yield batches
+
+
+def simulate(batch: TickerBatch, state: TickerState):
+    """Fill orders and update the streaming metrics for one ticker batch
+
+    Mirrors `TradingStrategy.backtest`: the position on a bar is the previous bar's
+    signal, and it earns the return from that bar's close to the next close.
+    """
+    signals = np.zeros(len(batch.closes), dtype=np.int8)
+    signals[batch.valid] = batch.signals
+    timestamps, closes, valid = batch.timestamps, batch.closes, batch.valid
+
+    if state.pending is not None:
+        p_ts, p_close, p_valid, p_signal = state.pending
+        timestamps = np.concatenate([[p_ts], timestamps])
+        closes = np.concatenate([[p_close], closes])
+        valid = np.concatenate([[p_valid], valid])
+        signals = np.concatenate([[p_signal], signals])
+    state.pending = (timestamps[-1], closes[-1], valid[-1], signals[-1])
+
+    # Every bar but the last now knows its next close
+    realized = valid[:-1]
+    next_return = (closes[1:] / closes[:-1] - 1)[realized]
+    if not len(next_return):
+        return
+    bar_signals = signals[:-1][realized]
+    bar_timestamps = timestamps[:-1][realized]
+
+    previous = state.last_signal if state.last_signal is not None else 0
+    positions = np.concatenate([[previous], bar_signals[:-1]]).astype(np.float64)
+    state.last_signal = bar_signals[-1]
+    strategy_return = positions * next_return
+
+    # The backtest ledger also counts its first bar as a trade
+    if state.position is None:
+        state.num_trades += 1 + int(np.count_nonzero(np.diff(positions)))
+    else:
+        state.num_trades += int(np.count_nonzero(np.diff(np.concatenate([[state.position], positions]))))
+    state.position = positions[-1]
+
+    # Merge the batch mean and variance into the running totals (Chan et al.)
+    n = len(strategy_return)
+    batch_mean = strategy_return.mean()
+    batch_m2 = ((strategy_return - batch_mean) ** 2).sum()
+    total = state.count + n
+    delta = batch_mean - state.mean
+    state.mean += delta * n / total
+    state.m2 += batch_m2 + delta * delta * state.count * n / total
+    state.count = total
+
+    value = state.strategy_value * np.cumprod(1 + strategy_return)
+    peaks = np.maximum.accumulate(np.concatenate([[state.peak], value]))[1:]
+    state.max_drawdown = min(state.max_drawdown, float((value / peaks - 1).min()))
+    state.peak = peaks[-1]
+    state.strategy_value = value[-1]
+    state.market_value *= float(np.prod(1 + next_return))
+
+    if state.first_timestamp is None:
+        state.first_timestamp = bar_timestamps[0]
+    state.last_timestamp = bar_timestamps[-1]
+
+
+def ticker_metrics(state: TickerState, initial_capital: float, periods_per_year: int) -> Dict[str, Any]:
+    """The metrics reported by `TradingStrategy.backtest`, from the streaming state"""
+    total_return = (state.strategy_value - 1) * 100
+    buy_hold_return = (state.market_value - 1) * 100
+
+    years = 0.0
+    if state.first_timestamp is not None:
+        years = (state.last_timestamp - state.first_timestamp) / np.timedelta64(1, 'D') / 365
+    annualized_return = ((1 + total_return / 100) ** (1 / years) - 1) * 100 if years > 0 else None
+
+    std = math.sqrt(state.m2 / (state.count - 1)) if state.count > 1 else 0.0
+    sharpe_ratio = math.sqrt(periods_per_year) * state.mean / std if std > 0 else None
+
+    return {
+        'total_return': total_return,
+        'buy_hold_return': buy_hold_return,
+        'annualized_return': annualized_return,
+        'sharpe_ratio': sharpe_ratio,
+        'max_drawdown': state.max_drawdown * 100,
+        'num_trades': state.num_trades,
+        'final_portfolio_value': initial_capital * state.strategy_value,
+        'bars': state.count
+    }
+
+
+class IntradayBacktestEngine:
+    """Event-driven backtest of a trained strategy model over local bar files"""
+
+    def __init__(self, model, threshold=0.6, initial_capital=10000,
+                 periods_per_year=MINUTE_BARS_PER_YEAR, chunksize=DEFAULT_CHUNKSIZE):
+        self.model = model
+        self.threshold = threshold
+        self.initial_capital = initial_capital
+        self.periods_per_year = periods_per_year
+        self.chunksize = chunksize
+
+    def run(self, paths: List[str], **columns) -> Dict[str, Any]:
+        """Stream every bar through features, signals and fills, and report metrics"""
+        states = {}
+        bars = 0
+
+        def counted(chunks):
+            nonlocal bars
+            for chunk in chunks:
+                bars += len(chunk)
+                yield chunk
+
+        start = time.perf_counter()
+        chunks = counted(read_bar_chunks(paths, self.chunksize, **columns))
+        for batches in signal_batches(feature_batches(chunks, states), self.model, self.threshold):
+            for batch in batches:
+                simulate(batch, states[batch.ticker])
+        elapsed = time.perf_counter() - start
+
+        return {
+            'tickers': {
+                ticker: ticker_metrics(state, self.initial_capital, self.periods_per_year)
+                for ticker, state in states.items()
+            },
+            'throughput': {
+                'bars': bars,
+                'seconds': elapsed,
+                'bars_per_second': bars / elapsed if elapsed > 0 else None,
+                'bars_per_minute': 60 * bars / elapsed if elapsed > 0 else None
+            }
+        }
+
+
+def train_model_on_bars(paths: List[str], max_bars: int = 200_000, model_type: str = 'random_forest',
+                        random_state: int = 42, chunksize: int = DEFAULT_CHUNKSIZE, **columns):
+    """Fit a strategy model on the first `max_bars` bars of the files"""
+    closes = {}
+    seen = 0
+    for chunk in read_bar_chunks(paths, min(chunksize, max_bars), **columns):
+        chunk = chunk.iloc[:max_bars - seen]
+        for ticker, group in chunk.groupby('ticker', sort=False):
+            closes.setdefault(ticker, []).append(group['close'].to_numpy())
+        seen += len(chunk)
+        if seen >= max_bars:
+            break
+
+    frames = []
+    for parts in closes.values():
+        df = add_features(pd.DataFrame({'Close': np.concatenate(parts)}))
+        df['Next_Return'] = df['Close'].shift(-1) / df['Close'] - 1
+        df['Target'] = (df['Next_Return'] > 0).astype(int)
+        frames.append(df.dropna())
+    if not frames:
+        raise ValueError("No bars found to train on")
+
+    data = pd.concat(frames)
+    model = build_model(model_type, random_state=random_state)
+    model.fit(data[FEATURES].to_numpy(), data['Target'].to_numpy())
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-driven intraday backtest over local bar files")
+    parser.add_argument('paths', nargs='+', help="CSV or Parquet bar files")
+    parser.add_argument('--train-bars', type=int, default=200_000)
+    parser.add_argument('--model', default='random_forest')
+    parser.add_argument('--threshold', type=float, default=0.6)
+    parser.add_argument('--initial-capital', type=float, default=10000)
+    parser.add_argument('--periods-per-year', type=int, default=MINUTE_BARS_PER_YEAR)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--time-column', default='timestamp')
+    parser.add_argument('--ticker-column', default='ticker')
+    parser.add_argument('--close-column', default='close')
+    args = parser.parse_args()
+
+    columns = {
+        'time_column': args.time_column,
+        'ticker_column': args.ticker_column,
+        'close_column': args.close_column
+    }
+    model = train_model_on_bars(args.paths, args.train_bars, args.model, chunksize=args.chunksize, **columns)
+    engine = IntradayBacktestEngine(model, args.threshold, args.initial_capital,
+                                    args.periods_per_year, args.chunksize)
+    print(json.dumps(engine.run(args.paths, **columns), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -88,7 +88,8 @@ class LLMService:
         return {
             "response": response,
             "collected_data": conversation["collected_data"],
-            "complete": conversation["complete"]
+            "complete": conversation["complete"],
+            "strategy_results": conversation["strategy_results"]
         }
     
     def _mock_llm_response(self, conversation: Dict[str, Any]) -> tuple[str, Optional[Dict[str, Any]]]:
@@ -96,10 +97,12 @@ class LLMService:
         messages = conversation["messages"]
         collected_data = conversation["collected_data"]
         last_message = messages[-1]["content"].lower()
+        # The history opens with the system prompt and greeting, so count the user's turns directly
+        user_turn = sum(1 for m in messages if m["role"] == "user")
         updated_data = {}
         
         # Process based on what data we've already collected
-        if collected_data["ticker"] == "SPY" and len(messages) == 2:  # First user message
+        if collected_data["ticker"] == "SPY" and user_turn == 1:  # First user message
             # Check if user provided a ticker
             if len(last_message.strip()) <= 5 and last_message.strip().isalpha():  # Simple check for ticker format
                 updated_data["ticker"] = last_message.strip().upper()
@@ -108,7 +111,7 @@ class LLMService:
             return f"I'll use {ticker} for our analysis. What start date would you like to use for historical data? (format: YYYY-MM-DD, default: 2018-01-01)", updated_data
         
         # Check for start date
-        elif collected_data["start_date"] == "2018-01-01" and len(messages) == 4:  # Second user message
+        elif collected_data["start_date"] == "2018-01-01" and user_turn == 2:  # Second user message
             import re
             # Check if user provided a date in YYYY-MM-DD format
             date_pattern = re.compile(r'\d{4}-\d{2}-\d{2}')
@@ -120,7 +123,7 @@ class LLMService:
             return f"I'll use {start_date} as the start date. Which ML model would you prefer for prediction? Options are 'random_forest' or 'logistic_regression' (default: random_forest)", updated_data
         
         # Check for model type
-        elif collected_data["model_type"] == "random_forest" and len(messages) == 6:  # Third user message
+        elif collected_data["model_type"] == "random_forest" and user_turn == 3:  # Third user message
             if "logistic" in last_message or "regression" in last_message:
                 updated_data["model_type"] = "logistic_regression"
             # Even if they didn't specify, we'll use the default random_forest
@@ -128,7 +131,7 @@ class LLMService:
             return f"I'll use the {model_type} model. What probability threshold would you like to use for trading signals? (0.5-0.9, default: 0.6)", updated_data
         
         # Check for threshold
-        elif collected_data["threshold"] == 0.6 and len(messages) == 8:  # Fourth user message
+        elif collected_data["threshold"] == 0.6 and user_turn == 4:  # Fourth user message
             try:
                 # Try to extract a number from the message
                 import re
@@ -144,7 +147,7 @@ class LLMService:
             return f"I'll use {threshold} as the probability threshold. What initial capital would you like to use for backtesting? (default: $10,000)", updated_data
         
         # Check for initial capital
-        elif collected_data["initial_capital"] == 10000 and len(messages) == 10:  # Fifth user message
+        elif collected_data["initial_capital"] == 10000 and user_turn == 5:  # Fifth user message
             try:
                 # Remove any currency symbols or commas
                 cleaned_input = last_message.replace("$", "").replace(",", "").strip()
@@ -171,7 +174,7 @@ class LLMService:
             return summary, updated_data
         
         # Confirmation and strategy execution
-        elif not conversation["complete"] and len(messages) == 12:  # Sixth user message (confirmation)
+        elif not conversation["complete"] and user_turn == 6:  # Sixth user message (confirmation)
             if "yes" in last_message or "correct" in last_message:
                 # Run the trading strategy with the collected parameters
                 try:
@@ -223,12 +226,5 @@ class LLMService:
             # If we're not sure where we are in the conversation, restart
             return "Let's start over. Which ticker symbol would you like to use? (default: SPY)", None
 
-    def get_conversation_data(self, conversation_id: str) -> Dict[str, Any]:
-        """Get the collected data for a conversation"""
-        if conversation_id not in self.conversation_history:
-            raise ValueError(f"Conversation {conversation_id} not found")
-        
-        return self.conversation_history[conversation_id]["collected_data"]
-
 # Initialize the LLM service
 llm_service = LLMService()
\ No newline at end of file
@@ -1,15 +1,25 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import yfinance as yf
+import data_provider
 import pandas as pd
 import numpy as np
 import json
+import os
 from typing import List, Dict, Any, Optional
 
 # Import custom modules
 from llm_service import LLMService
-from trading_strategy import run_strategy_with_params
+from trading_strategy import TradingStrategy, run_strategy_with_params
+from models import SUPPORTED_MODELS
+from cross_validation import CV_METHODS
+from hyperparameter_search import SEARCH_METHODS
+from risk_analytics import compute_risk_analytics, DEFAULT_WINDOWS
+from columnar import negotiate_format, strategy_columns, columnar_response
+from correlation_service import CorrelationService, DEFAULT_UNIVERSE
+from bulk_recommendations import BulkRecommendationPipeline, read_profile_rows, stream_ndjson, stream_csv
+from rebalancing import simulate_policies, parse_policy, DEFAULT_POLICIES
 
 app = FastAPI(title="QuantEase API", description="Democratized Quant Trading Assistant")
 
@@ -24,6 +34,14 @@ app.add_middleware(
 
 # Initialize services
 llm_service = LLMService()
+correlation_service = CorrelationService(
+    universe=os.getenv("CORRELATION_UNIVERSE", ",".join(DEFAULT_UNIVERSE)).split(","),
+    fetch_prices=lambda tickers, start: fetch_historical_data(tickers, start=start),
+    state_path=os.getenv("CORRELATION_STATE_PATH", "correlation_state.npz"),
+    halflife=float(os.getenv("CORRELATION_HALFLIFE", "63"))
+)
+
+DEFAULT_TRANSACTION_COST_BPS = 5.0
 
 # Models
 class UserProfile(BaseModel):
@@ -33,6 +51,8 @@ class UserProfile(BaseModel):
     horizon_years: int
     capital_usd: float
     automation_enabled: bool = False
+    rebalancing: str = "none"  # "none", "monthly", "quarterly", "annual" or "threshold_<pct>"
+    transaction_cost_bps: float = DEFAULT_TRANSACTION_COST_BPS
 
 class PortfolioAsset(BaseModel):
     ticker: str
@@ -43,6 +63,16 @@ class BacktestResult(BaseModel):
     cagr: float
     sharpe: float
 
+class RebalancingResult(BaseModel):
+    policy: str
+    num_rebalances: int
+    turnover: float
+    total_cost: float
+    cagr: float
+    volatility: float
+    sharpe: float
+    max_drawdown: float
+
 class PortfolioRecommendation(BaseModel):
     portfolio: List[PortfolioAsset]
     expected_return: float
@@ -50,6 +80,7 @@ class PortfolioRecommendation(BaseModel):
     max_drawdown: float
     backtest: BacktestResult
     rationale: List[str]
+    rebalancing: Optional[RebalancingResult] = None
 
 class ConversationMessage(BaseModel):
     message: str
@@ -60,6 +91,25 @@ class TradingStrategyParams(BaseModel):
     model_type: str = "random_forest"
     threshold: float = 0.6
     initial_capital: float = 10000.0
+    cv: Optional[str] = None  # "purged_kfold" or "time_series"
+    n_splits: int = 5
+    tune: Optional[str] = None  # "successive_halving" or "hyperband"
+
+class RiskAnalyticsRequest(BaseModel):
+    portfolio: Optional[List[PortfolioAsset]] = None
+    strategy: Optional[TradingStrategyParams] = None
+    windows: List[int] = DEFAULT_WINDOWS
+    benchmark: str = "SPY"
+
+class DiversificationRequest(BaseModel):
+    portfolio: Optional[List[PortfolioAsset]] = None
+    profile: Optional[UserProfile] = None
+
+class RebalancingRequest(BaseModel):
+    portfolio: Optional[List[PortfolioAsset]] = None
+    profile: Optional[UserProfile] = None
+    policies: List[str] = DEFAULT_POLICIES
+    transaction_cost_bps: Optional[float] = None  # defaults to the profile's, or 5 bps
 
 class ConversationResponse(BaseModel):
     response: str
@@ -107,22 +157,156 @@ def get_conversation_data(conversation_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/trading-strategy/run")
-def run_trading_strategy(params: TradingStrategyParams):
-    """Run a trading strategy with the specified parameters"""
+def run_trading_strategy(params: TradingStrategyParams, request: Request):
+    """Run a trading strategy with the specified parameters
+    
+    Clients that accept Arrow IPC or msgpack receive the full equity curves,
+    positions and trade ledger as columns instead of the JSON summary.
+    """
+    validate_strategy_params(params)
+    fmt = negotiate_format(request.headers.get("accept"))
     try:
+        if fmt != "json":
+            strategy = TradingStrategy(ticker=params.ticker, start_date=params.start_date)
+            result = strategy.run_strategy(
+                model_type=params.model_type,
+                threshold=params.threshold,
+                initial_capital=params.initial_capital,
+                cv=params.cv,
+                n_splits=params.n_splits,
+                tune=params.tune
+            )
+            return columnar_response(
+                fmt,
+                strategy_columns(strategy.data),
+                {"summary": result["summary"], "metrics": result["metrics"]},
+                request.headers.get("accept-encoding")
+            )
+        
         result = run_strategy_with_params(
             ticker=params.ticker,
             model_type=params.model_type,
             start_date=params.start_date,
             threshold=params.threshold,
-            initial_capital=params.initial_capital
+            initial_capital=params.initial_capital,
+            cv=params.cv,
+            n_splits=params.n_splits,
+            tune=params.tune
         )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analytics/risk")
+def risk_analytics(request: RiskAnalyticsRequest):
+    """Rolling risk analytics for a portfolio or a trading strategy"""
+    if (request.portfolio is None) == (request.strategy is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of portfolio or strategy")
+    if any(w < 2 for w in request.windows):
+        raise HTTPException(status_code=400, detail="Rolling windows must be at least 2 periods")
+    if request.strategy is not None:
+        validate_strategy_params(request.strategy)
+
+    try:
+        if request.portfolio is not None:
+            weights = {asset.ticker: asset.weight for asset in request.portfolio}
+            data = fetch_historical_data(list(weights.keys()))
+            returns = build_portfolio_series(data, weights).pct_change().dropna()
+            benchmark = _price_series(fetch_historical_data([request.benchmark])).pct_change().dropna()
+        else:
+            params = request.strategy
+            strategy = TradingStrategy(ticker=params.ticker, start_date=params.start_date)
+            strategy.run_backtest(
+                model_type=params.model_type,
+                threshold=params.threshold,
+                initial_capital=params.initial_capital,
+                cv=params.cv,
+                n_splits=params.n_splits,
+                tune=params.tune
+            )
+            # Strategy returns are earned from each date to the next, so align the benchmark the same way
+            returns = strategy.data['Strategy_Return']
+            benchmark_prices = _price_series(fetch_historical_data([request.benchmark]))
+            benchmark = (benchmark_prices.shift(-1) / benchmark_prices - 1).dropna()
+
+        result = compute_risk_analytics(returns, benchmark, windows=request.windows)
+        if request.strategy is not None and 'hyperparameter_search' in strategy.metrics:
+            result["hyperparameter_search"] = strategy.metrics['hyperparameter_search']['best']
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/correlation/matrix")
+def correlation_matrix(kind: str = "full", clustered: bool = False):
+    """Correlation matrix of the ticker universe from the incremental covariance state"""
+    try:
+        correlation_service.refresh()
+        return correlation_service.correlation_matrix(kind=kind, clustered=clustered)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/correlation/diversification")
+def diversification_ratio(request: DiversificationRequest):
+    """Diversification ratio of a portfolio, or of the portfolio recommended for a profile"""
+    if (request.portfolio is None) == (request.profile is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of portfolio or profile")
+
+    try:
+        if request.portfolio is not None:
+            weights = {asset.ticker: asset.weight for asset in request.portfolio}
+        else:
+            weights = get_portfolio_weights(request.profile)
+        correlation_service.refresh()
+        return {
+            "portfolio": [{"ticker": t, "weight": w} for t, w in weights.items()],
+            "diversification_ratio": round(correlation_service.diversification_ratio(weights, kind="full"), 3),
+            "ewm_diversification_ratio": round(correlation_service.diversification_ratio(weights, kind="ewm"), 3)
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/rebalancing/compare")
+def compare_rebalancing(request: RebalancingRequest):
+    """Compare rebalancing policies for a portfolio, or for the portfolio recommended for a profile"""
+    if (request.portfolio is None) == (request.profile is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of portfolio or profile")
+
+    try:
+        for policy in request.policies:
+            parse_policy(policy)
+        cost_bps = request.transaction_cost_bps
+        if request.portfolio is not None:
+            weights = {asset.ticker: asset.weight for asset in request.portfolio}
+        else:
+            weights = get_portfolio_weights(request.profile)
+            if cost_bps is None:
+                cost_bps = request.profile.transaction_cost_bps
+        if cost_bps is None:
+            cost_bps = DEFAULT_TRANSACTION_COST_BPS
+        data = fetch_historical_data(list(weights.keys()))
+        return {
+            "portfolio": [{"ticker": t, "weight": w} for t, w in weights.items()],
+            "transaction_cost_bps": cost_bps,
+            "policies": calculate_rebalancing_metrics(data, weights, request.policies, cost_bps)
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/recommendation", response_model=PortfolioRecommendation)
 def recommend_portfolio(profile: UserProfile):
+    try:
+        parse_policy(profile.rebalancing)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         # Validate risk score
         if not 1 <= profile.risk_score <= 10:
@@ -140,6 +324,10 @@ def recommend_portfolio(profile: UserProfile):
         # Generate rationale
         rationale = generate_rationale(profile, weights, metrics)
         
+        # Simulate the selected rebalancing policy
+        rebalancing = calculate_rebalancing_metrics(data, weights, [profile.rebalancing],
+                                                    profile.transaction_cost_bps)[0]
+        
         # Format response
         return {
             "portfolio": [{"ticker": t, "weight": w} for t, w in weights.items()],
@@ -151,12 +339,48 @@ def recommend_portfolio(profile: UserProfile):
                 "cagr": metrics["cagr"],
                 "sharpe": metrics["sharpe"]
             },
-            "rationale": rationale
+            "rationale": rationale,
+            "rebalancing": rebalancing
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/recommendation/bulk")
+def bulk_recommendations(file: UploadFile = File(...), output: str = "ndjson"):
+    """Stream recommendations for a CSV or JSONL file of user profiles as NDJSON or CSV"""
+    filename = (file.filename or "").lower()
+    if filename.endswith(".csv") or file.content_type == "text/csv":
+        input_format = "csv"
+    elif filename.endswith((".jsonl", ".ndjson")) or file.content_type in ("application/x-ndjson", "application/jsonl"):
+        input_format = "jsonl"
+    else:
+        raise HTTPException(status_code=400, detail="Upload a .csv or .jsonl file of user profiles")
+    if output not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Output must be ndjson or csv")
+
+    pipeline = BulkRecommendationPipeline(
+        profile_model=UserProfile,
+        weights_fn=get_portfolio_weights,
+        metrics_fn=calculate_portfolio_metrics,
+        rationale_fn=generate_rationale,
+        rebalancing_fn=calculate_rebalancing_metrics,
+        fetch_prices=fetch_historical_data
+    )
+    rows = read_profile_rows(file.file, input_format)
+    if output == "csv":
+        return StreamingResponse(stream_csv(pipeline, rows), media_type="text/csv")
+    return StreamingResponse(stream_ndjson(pipeline, rows), media_type="application/x-ndjson")
+
 # Helper functions
+def validate_strategy_params(params: TradingStrategyParams):
+    """Reject unsupported strategy options before any data is fetched"""
+    if params.model_type not in SUPPORTED_MODELS:
+        raise HTTPException(status_code=400, detail=f"Unsupported model type: {params.model_type}")
+    if params.cv is not None and params.cv not in CV_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported cross-validation method: {params.cv}")
+    if params.tune is not None and params.tune not in SEARCH_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported search method: {params.tune}")
+
 def get_portfolio_weights(profile: UserProfile) -> Dict[str, float]:
     """Determine portfolio weights based on user profile"""
     # Basic implementation - can be expanded with more sophisticated logic
@@ -182,22 +406,38 @@ def get_portfolio_weights(profile: UserProfile) -> Dict[str, float]:
         else:
             return {"SPY": 0.3, "QQQ": 0.1, "EFA": 0.1, "AGG": 0.5}
 
-def fetch_historical_data(tickers: List[str]) -> pd.DataFrame:
+def fetch_historical_data(tickers: List[str], start: Optional[str] = None) -> pd.DataFrame:
     """Fetch historical price data for the given tickers"""
     try:
+        if start is not None:
+            data = data_provider.download(tickers, start=start)["Adj Close"]
+            return data
         # Fetch 10 years of data
-        data = yf.download(tickers, period="10y")["Adj Close"]
+        data = data_provider.download(tickers, period="10y")["Adj Close"]
         return data
     except Exception as e:
         raise Exception(f"Failed to fetch historical data: {str(e)}")
 
-def calculate_portfolio_metrics(data: pd.DataFrame, weights: Dict[str, float]) -> Dict[str, float]:
-    """Calculate portfolio performance metrics"""
+def build_portfolio_series(data: pd.DataFrame, weights: Dict[str, float]) -> pd.Series:
+    """Build the value of a buy-and-hold portfolio normalized to its first day"""
     # Normalize data
     normed = data / data.iloc[0]
     
     # Calculate portfolio performance
-    portfolio = (normed * pd.Series(weights)).sum(axis=1)
+    return (normed * pd.Series(weights)).sum(axis=1)
+
+def _price_series(data) -> pd.Series:
+    """Reduce a single-ticker download to a price series"""
+    if isinstance(data, pd.DataFrame):
+        return data.iloc[:, 0]
+    return data
+
+def calculate_portfolio_metrics(data: pd.DataFrame, weights: Dict[str, float]) -> Dict[str, float]:
+    """Calculate portfolio performance metrics"""
+    return series_metrics(build_portfolio_series(data, weights))
+
+def series_metrics(portfolio: pd.Series) -> Dict[str, float]:
+    """Performance metrics of a portfolio value series"""
     returns = portfolio.pct_change().dropna()
     
     # Calculate metrics
@@ -216,6 +456,24 @@ def calculate_portfolio_metrics(data: pd.DataFrame, weights: Dict[str, float]) -
         "max_drawdown": round(dd, 3)
     }
 
+def calculate_rebalancing_metrics(data: pd.DataFrame, weights: Dict[str, float], policies: List[str],
+                                  cost_bps: float) -> List[Dict[str, Any]]:
+    """Performance metrics of the portfolio under each rebalancing policy"""
+    results = []
+    for policy, result in simulate_policies(data, weights, policies, cost_bps).items():
+        metrics = series_metrics(result["value"])
+        results.append({
+            "policy": policy,
+            "num_rebalances": result["num_rebalances"],
+            "turnover": round(result["turnover"], 3),
+            "total_cost": round(result["total_cost"], 5),
+            "cagr": metrics["cagr"],
+            "volatility": metrics["volatility"],
+            "sharpe": metrics["sharpe"],
+            "max_drawdown": metrics["max_drawdown"]
+        })
+    return results
+
 def generate_rationale(profile: UserProfile, weights: Dict[str, float], metrics: Dict[str, float]) -> List[str]:
     """Generate plain-language rationale for the recommendation"""
     rationale = []
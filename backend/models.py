@@ -0,0 +1,14 @@
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+SUPPORTED_MODELS = ('random_forest', 'logistic_regression')
+
+
+def build_model(model_type='random_forest', random_state=42, **params):
+    """Create an unfitted classifier for the given model type"""
+    if model_type not in SUPPORTED_MODELS:
+        raise ValueError(f"Unsupported model type: {model_type}")
+    if model_type == 'random_forest':
+        params.setdefault('n_estimators', 100)
+        return RandomForestClassifier(random_state=random_state, **params)
+    return LogisticRegression(random_state=random_state, **params)
@@ -0,0 +1,336 @@
+"""Cross-process price cache in named shared memory
+
+One loader process downloads aligned (field x date x ticker) price arrays and publishes
+them to shared memory; every uvicorn worker maps the same pages read-only instead of
+holding its own copy of each ticker's history. Run the loader from the backend directory:
+
+    python price_cache.py --tickers SPY,QQQ,EFA,AGG --start 2000-01-01 --refresh 86400
+
+and start the API with DATA_PROVIDER=shared_cache. Each refresh is written to a new data
+segment and then announced by bumping the generation counter in a small control segment,
+so workers swap to the new data on their next download without restarting.
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from data_provider import PERIOD_YEARS, SyntheticDataProvider, YahooDataProvider
+from shared_memory_utils import attach_shared_memory
+
+DEFAULT_CACHE_NAME = os.getenv("PRICE_CACHE_NAME", "quantease_prices")
+DEFAULT_TICKERS = ["SPY", "QQQ", "EFA", "AGG"]
+LAYOUT_VERSION = 1
+
+# Control segment: magic, layout version, sequence (odd while being written),
+# generation, length of the data segment name, then the name itself
+CONTROL_MAGIC = b"QEPRCTL\0"
+CONTROL_HEADER = struct.Struct("<8sIQQI")
+CONTROL_NAME_SIZE = 128
+
+# Data segment: magic, layout version, generation, field/date/ticker counts, length of
+# the JSON metadata that follows; the dates and values arrays start at `data_offset`
+DATA_MAGIC = b"QEPRDAT\0"
+DATA_HEADER = struct.Struct("<8sIQIIII")
+ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _read_control(buf) -> Optional[tuple]:
+    """Generation and data segment name, or None while the loader is mid-write"""
+    magic, version, sequence, generation, name_length = CONTROL_HEADER.unpack_from(buf, 0)
+    if magic != CONTROL_MAGIC:
+        raise ValueError("Not a price cache control segment")
+    if version != LAYOUT_VERSION:
+        raise ValueError(f"Unsupported price cache layout version: {version}")
+    if sequence % 2:
+        return None
+    name = bytes(buf[CONTROL_HEADER.size:CONTROL_HEADER.size + name_length]).decode()
+    # Seqlock: the read is only consistent if no write started in between
+    if CONTROL_HEADER.unpack_from(buf, 0)[2] != sequence:
+        return None
+    return generation, name
+
+
+class CachedPrices:
+    """Read-only views of one published generation of the price cache"""
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        magic, version, generation, n_fields, n_dates, n_tickers, meta_length = DATA_HEADER.unpack_from(shm.buf, 0)
+        if magic != DATA_MAGIC:
+            raise ValueError("Not a price cache data segment")
+        if version != LAYOUT_VERSION:
+            raise ValueError(f"Unsupported price cache layout version: {version}")
+
+        meta = json.loads(bytes(shm.buf[DATA_HEADER.size:DATA_HEADER.size + meta_length]))
+        dates_offset = _aligned(DATA_HEADER.size + meta_length)
+        values_offset = _aligned(dates_offset + 8 * n_dates)
+
+        self.shm = shm
+        self.generation = generation
+        self.fields: List[str] = meta["fields"]
+        self.tickers: List[str] = meta["tickers"]
+        self.start = pd.Timestamp(meta["start"])
+        self.published_at = meta["published_at"]
+        self._columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        dates = np.ndarray((n_dates,), dtype=np.int64, buffer=shm.buf, offset=dates_offset)
+        self.values = np.ndarray((n_fields, n_dates, n_tickers), dtype=np.float64,
+                                 buffer=shm.buf, offset=values_offset)
+        dates.flags.writeable = False
+        self.values.flags.writeable = False
+        self.dates = pd.DatetimeIndex(dates.view("datetime64[ns]"))
+
+    def covers(self, tickers: List[str], start: Optional[pd.Timestamp]) -> bool:
+        """Whether every ticker is cached from `start` (or from the beginning) onwards"""
+        if start is not None and start < self.start:
+            return False
+        return all(ticker in self._columns for ticker in tickers)
+
+    def frame(self, tickers: Union[str, List[str]], start: Optional[pd.Timestamp] = None,
+              end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """A `yf.download`-shaped frame for a date range, copied out of the shared arrays
+
+        Like yfinance, `end` is exclusive and a single ticker string gives flat columns.
+        """
+        names = [tickers] if isinstance(tickers, str) else list(tickers)
+        first = 0 if start is None else self.dates.searchsorted(start, side="left")
+        last = len(self.dates) if end is None else self.dates.searchsorted(end, side="left")
+        # Fancy indexing copies, so no returned frame keeps the shared block mapped
+        block = self.values[:, first:last][:, :, [self._columns[t] for t in names]]
+        index = self.dates[first:last]
+
+        if isinstance(tickers, str):
+            data = pd.DataFrame(block[:, :, 0].T, index=index, columns=self.fields)
+        else:
+            columns = pd.MultiIndex.from_product([self.fields, names])
+            data = pd.DataFrame(block.transpose(1, 0, 2).reshape(len(index), -1), index=index, columns=columns)
+        return data.dropna(how="all")
+
+    def close(self) -> bool:
+        """Unmap the segment; False while views of it are still in use"""
+        try:
+            self.shm.close()
+        except BufferError:
+            return False
+        return True
+
+    def __del__(self):
+        # Nothing holds this generation any more, so its own views can go before the mapping
+        if getattr(self, "shm", None) is not None:
+            self.values = None
+            self.close()
+
+
+class PriceCacheReader:
+    """Attaches to the published price cache and follows its generation counter"""
+
+    def __init__(self, name: str = DEFAULT_CACHE_NAME):
+        self.name = name
+        self._control = None
+        self._prices: Optional[CachedPrices] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> CachedPrices:
+        """The latest generation, attaching to it first if the loader published a new one
+
+        Raises FileNotFoundError when no loader has published the cache.
+        """
+        prices = self._prices
+        if prices is not None and self._generation() == prices.generation:
+            return prices
+
+        with self._lock:
+            for _ in range(100):
+                if self._control is None:
+                    self._control = attach_shared_memory(f"{self.name}_control", untrack=True)
+                control = _read_control(self._control.buf)
+                if control is None:
+                    time.sleep(0.001)
+                    continue
+                generation, segment = control
+                if self._prices is not None and self._prices.generation == generation:
+                    return self._prices
+                try:
+                    prices = CachedPrices(attach_shared_memory(segment, untrack=True))
+                except FileNotFoundError:
+                    # Superseded and unlinked between reading the control and attaching
+                    continue
+                # Callers still holding the previous generation keep it mapped until they drop it
+                self._prices = prices
+                return prices
+        raise RuntimeError(f"Price cache {self.name} is being rewritten too often to attach")
+
+    def _generation(self) -> Optional[int]:
+        control = _read_control(self._control.buf)
+        return None if control is None else control[0]
+
+    def close(self):
+        """Detach from the cache; generations callers still hold stay mapped until released"""
+        self._prices = None
+        if self._control is not None:
+            self._control.close()
+            self._control = None
+
+
+class SharedPriceCacheProvider:
+    """Data provider that serves downloads from the shared price cache
+
+    Requests the cache cannot answer (uncached tickers, dates before the cached history,
+    other download options) or made before any loader has published go to `fallback`.
+    """
+
+    def __init__(self, name: str = DEFAULT_CACHE_NAME, fallback=None):
+        self.reader = PriceCacheReader(name)
+        self.fallback = fallback if fallback is not None else YahooDataProvider()
+
+    def download(self, tickers: Union[str, List[str]], start: Optional[str] = None,
+                 end: Optional[str] = None, period: Optional[str] = None, **kwargs) -> pd.DataFrame:
+        names = [tickers] if isinstance(tickers, str) else list(tickers)
+        first = pd.Timestamp(start) if start is not None else None
+        if period is not None and first is None:
+            first = pd.Timestamp.today().normalize() - pd.DateOffset(years=PERIOD_YEARS.get(period, 10))
+
+        if not kwargs:
+            try:
+                prices = self.reader.current()
+            except FileNotFoundError:
+                prices = None
+            if prices is not None and prices.covers(names, first):
+                return prices.frame(tickers, first, pd.Timestamp(end) if end is not None else None)
+
+        return self.fallback.download(tickers, start=start, end=end, period=period, **kwargs)
+
+
+class PriceCachePublisher:
+    """Owns the shared price cache: writes each generation and retires the previous one"""
+
+    def __init__(self, name: str = DEFAULT_CACHE_NAME):
+        self.name = name
+        self.generation = 0
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        control_size = CONTROL_HEADER.size + CONTROL_NAME_SIZE
+        try:
+            self._control = shared_memory.SharedMemory(name=f"{name}_control", create=True, size=control_size)
+            CONTROL_HEADER.pack_into(self._control.buf, 0, CONTROL_MAGIC, LAYOUT_VERSION, 0, 0, 0)
+        except FileExistsError:
+            # Left behind by a previous loader: keep counting so workers still see a change
+            self._control = shared_memory.SharedMemory(name=f"{name}_control")
+            control = _read_control(self._control.buf)
+            if control is not None:
+                self.generation = control[0]
+
+    def publish(self, data: pd.DataFrame, start: Optional[str] = None) -> int:
+        """Publish a multi-ticker `yf.download` frame as the next generation"""
+        fields = list(data.columns.get_level_values(0).unique())
+        tickers = list(data.columns.get_level_values(1).unique())
+        data = data.reindex(columns=pd.MultiIndex.from_product([fields, tickers])).sort_index()
+        values = data.to_numpy(dtype=np.float64).reshape(len(data), len(fields), len(tickers)).transpose(1, 0, 2)
+        dates = data.index.values.astype("datetime64[ns]").view(np.int64)
+
+        generation = self.generation + 1
+        meta = json.dumps({
+            "fields": fields,
+            "tickers": tickers,
+            "start": str(pd.Timestamp(start) if start is not None else data.index[0]),
+            "published_at": time.time()
+        }).encode()
+        dates_offset = _aligned(DATA_HEADER.size + len(meta))
+        values_offset = _aligned(dates_offset + dates.nbytes)
+
+        segment_name = f"{self.name}_{generation}"
+        size = values_offset + values.nbytes
+        try:
+            segment = shared_memory.SharedMemory(name=segment_name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=segment_name)
+            stale.close()
+            stale.unlink()
+            segment = shared_memory.SharedMemory(name=segment_name, create=True, size=size)
+
+        DATA_HEADER.pack_into(segment.buf, 0, DATA_MAGIC, LAYOUT_VERSION, generation,
+                              len(fields), len(dates), len(tickers), len(meta))
+        segment.buf[DATA_HEADER.size:DATA_HEADER.size + len(meta)] = meta
+        np.ndarray(dates.shape, dtype=np.int64, buffer=segment.buf, offset=dates_offset)[...] = dates
+        np.ndarray(values.shape, dtype=np.float64, buffer=segment.buf, offset=values_offset)[...] = values
+
+        self._announce(generation, segment_name)
+        # Workers still mapping the old generation keep their pages until they swap
+        self._retire()
+        self._segment = segment
+        self.generation = generation
+        return generation
+
+    def _announce(self, generation: int, segment_name: str):
+        """Point the control segment at a new data segment under the seqlock"""
+        encoded = segment_name.encode()
+        if len(encoded) > CONTROL_NAME_SIZE:
+            raise ValueError(f"Price cache name is too long: {self.name}")
+        buf = self._control.buf
+        sequence = CONTROL_HEADER.unpack_from(buf, 0)[2]
+        CONTROL_HEADER.pack_into(buf, 0, CONTROL_MAGIC, LAYOUT_VERSION, sequence + 1, generation, len(encoded))
+        buf[CONTROL_HEADER.size:CONTROL_HEADER.size + len(encoded)] = encoded
+        CONTROL_HEADER.pack_into(buf, 0, CONTROL_MAGIC, LAYOUT_VERSION, sequence + 2, generation, len(encoded))
+
+    def _retire(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+
+    def load(self, provider, tickers: List[str], start: Optional[str] = None, period: str = "10y") -> int:
+        """Download `tickers` through `provider` and publish them"""
+        if start is not None:
+            data = provider.download(list(tickers), start=start)
+        else:
+            data = provider.download(list(tickers), period=period)
+        return self.publish(data, start=start)
+
+    def close(self):
+        """Unlink the current generation and the control segment"""
+        self._retire()
+        self._control.close()
+        try:
+            self._control.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish price history to the shared-memory price cache")
+    parser.add_argument("--name", default=DEFAULT_CACHE_NAME, help="Shared memory name prefix (PRICE_CACHE_NAME)")
+    parser.add_argument("--tickers", default=",".join(DEFAULT_TICKERS), help="Comma-separated tickers")
+    parser.add_argument("--start", default="2000-01-01", help="First date to cache")
+    parser.add_argument("--refresh", type=float, default=86400, help="Seconds between reloads")
+    parser.add_argument("--synthetic", action="store_true", help="Publish synthetic prices instead of Yahoo Finance")
+    args = parser.parse_args()
+
+    provider = SyntheticDataProvider() if args.synthetic else YahooDataProvider()
+    tickers = [t.strip() for t in args.tickers.split(",") if t.strip()]
+    publisher = PriceCachePublisher(args.name)
+    try:
+        # The cache lives only as long as this process, so keep it running beside the API
+        while True:
+            started = time.perf_counter()
+            generation = publisher.load(provider, tickers, start=args.start)
+            print(f"Published generation {generation}: {len(tickers)} tickers "
+                  f"in {time.perf_counter() - started:.1f}s", flush=True)
+            time.sleep(args.refresh)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import math
+from collections import deque
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_WINDOWS = [21, 63, 252]
+
+
+class RollingRiskWindow:
+    """Streaming rolling Sharpe, volatility, beta and underwater state for one window length"""
+
+    def __init__(self, window: int, periods_per_year: int = TRADING_DAYS_PER_YEAR):
+        if window < 2:
+            raise ValueError("Rolling window must be at least 2 periods")
+        self.window = window
+        self.annualization = math.sqrt(periods_per_year)
+
+        # Ring buffers of the last `window` strategy and benchmark returns
+        self._returns = np.zeros(window)
+        self._benchmark = np.zeros(window)
+        self._pos = 0
+        self._count = 0
+
+        # Running sums for mean, variance and covariance
+        self._sum_r = 0.0
+        self._sum_rr = 0.0
+        self._sum_b = 0.0
+        self._sum_bb = 0.0
+        self._sum_rb = 0.0
+
+        # Monotonic deque of (index, equity) for the trailing window peak
+        self._peaks = deque()
+        self._index = 0
+
+    def _resync(self):
+        """Recompute the running sums from the buffer to stop floating point drift"""
+        r = self._returns[:self._count]
+        b = self._benchmark[:self._count]
+        self._sum_r = float(r.sum())
+        self._sum_rr = float(r @ r)
+        self._sum_b = float(b.sum())
+        self._sum_bb = float(b @ b)
+        self._sum_rb = float(r @ b)
+
+    def update(self, ret: float, bench: float, equity: float) -> Dict[str, Optional[float]]:
+        """Push one period and return the statistics for the window ending at it"""
+        if self._count == self.window:
+            old_r = self._returns[self._pos]
+            old_b = self._benchmark[self._pos]
+            self._sum_r -= old_r
+            self._sum_rr -= old_r * old_r
+            self._sum_b -= old_b
+            self._sum_bb -= old_b * old_b
+            self._sum_rb -= old_r * old_b
+        else:
+            self._count += 1
+
+        self._returns[self._pos] = ret
+        self._benchmark[self._pos] = bench
+        self._sum_r += ret
+        self._sum_rr += ret * ret
+        self._sum_b += bench
+        self._sum_bb += bench * bench
+        self._sum_rb += ret * bench
+        self._pos = (self._pos + 1) % self.window
+
+        # Once per full lap of the buffer, so the pass stays amortized O(1)
+        if self._pos == 0:
+            self._resync()
+
+        # Trailing peak of the equity curve
+        while self._peaks and self._peaks[-1][1] <= equity:
+            self._peaks.pop()
+        self._peaks.append((self._index, equity))
+        if self._peaks[0][0] <= self._index - self.window:
+            self._peaks.popleft()
+        self._index += 1
+        underwater = equity / self._peaks[0][1] - 1 if self._peaks[0][1] > 0 else None
+
+        if self._count < self.window:
+            return {"sharpe": None, "volatility": None, "beta": None, "underwater": underwater}
+
+        n = self._count
+        mean_r = self._sum_r / n
+        var_r = max((self._sum_rr - n * mean_r * mean_r) / (n - 1), 0.0)
+        mean_b = self._sum_b / n
+        var_b = max((self._sum_bb - n * mean_b * mean_b) / (n - 1), 0.0)
+        cov_rb = (self._sum_rb - n * mean_r * mean_b) / (n - 1)
+
+        std_r = math.sqrt(var_r)
+        return {
+            "sharpe": self.annualization * mean_r / std_r if std_r > 0 else None,
+            "volatility": std_r * self.annualization,
+            "beta": cov_rb / var_b if var_b > 0 else None,
+            "underwater": underwater
+        }
+
+
+def drawdown_episodes(equity: Sequence[float], dates: Sequence[Any]) -> Dict[str, Any]:
+    """Find drawdown episodes and the full-history underwater curve in a single pass"""
+    underwater = []
+    episodes = []
+    peak = -math.inf
+    peak_idx = 0
+    trough = math.inf
+    trough_idx = 0
+    in_drawdown = False
+
+    for i, value in enumerate(equity):
+        if value >= peak:
+            if in_drawdown:
+                episodes.append(_episode(dates, peak, peak_idx, trough, trough_idx, i))
+                in_drawdown = False
+            peak = value
+            peak_idx = i
+            underwater.append(0.0)
+            continue
+
+        if not in_drawdown:
+            in_drawdown = True
+            trough = value
+            trough_idx = i
+        elif value < trough:
+            trough = value
+            trough_idx = i
+        underwater.append(value / peak - 1)
+
+    # An episode that has not recovered by the end of the history
+    if in_drawdown:
+        episodes.append(_episode(dates, peak, peak_idx, trough, trough_idx, None))
+
+    return {"underwater": underwater, "episodes": episodes}
+
+
+def _episode(dates, peak, peak_idx, trough, trough_idx, recovery_idx) -> Dict[str, Any]:
+    """Describe a single drawdown episode"""
+    return {
+        "start": _format_date(dates[peak_idx]),
+        "trough": _format_date(dates[trough_idx]),
+        "recovery": _format_date(dates[recovery_idx]) if recovery_idx is not None else None,
+        "depth": trough / peak - 1,
+        "periods_to_trough": trough_idx - peak_idx,
+        "periods_to_recovery": recovery_idx - trough_idx if recovery_idx is not None else None,
+        "duration": recovery_idx - peak_idx if recovery_idx is not None else None
+    }
+
+
+def _format_date(value) -> str:
+    """Format an index label for JSON output"""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def _clean(values: List[Optional[float]]) -> List[Optional[float]]:
+    """Replace non-finite floats with None so the output is valid JSON"""
+    return [v if v is not None and math.isfinite(v) else None for v in values]
+
+
+def compute_risk_analytics(returns: pd.Series, benchmark_returns: pd.Series,
+                           windows: Optional[List[int]] = None,
+                           periods_per_year: int = TRADING_DAYS_PER_YEAR,
+                           max_episodes: int = 10) -> Dict[str, Any]:
+    """Compute rolling risk statistics, drawdown episodes and underwater curves"""
+    windows = windows or DEFAULT_WINDOWS
+    aligned = pd.concat([returns, benchmark_returns], axis=1, join="inner").dropna()
+    if aligned.empty:
+        raise ValueError("No overlapping returns between the series and its benchmark")
+
+    dates = aligned.index
+    ret = aligned.iloc[:, 0].to_numpy(dtype=float)
+    bench = aligned.iloc[:, 1].to_numpy(dtype=float)
+    equity = np.cumprod(1 + ret)
+
+    rolling = {}
+    for window in sorted(set(windows)):
+        if window > len(ret):
+            continue
+        state = RollingRiskWindow(window, periods_per_year)
+        sharpe, volatility, beta, underwater = [], [], [], []
+
+        for r, b, e in zip(ret.tolist(), bench.tolist(), equity.tolist()):
+            stats = state.update(r, b, e)
+            sharpe.append(stats["sharpe"])
+            volatility.append(stats["volatility"])
+            beta.append(stats["beta"])
+            underwater.append(stats["underwater"])
+
+        rolling[str(window)] = {
+            "sharpe": _clean(sharpe),
+            "volatility": _clean(volatility),
+            "beta": _clean(beta),
+            "underwater": _clean(underwater)
+        }
+
+    drawdowns = drawdown_episodes(equity.tolist(), dates)
+    episodes = sorted(drawdowns["episodes"], key=lambda ep: ep["depth"])[:max_episodes]
+
+    return {
+        "dates": [_format_date(d) for d in dates],
+        "windows": rolling,
+        "underwater": _clean(drawdowns["underwater"]),
+        "drawdown_episodes": episodes,
+        "max_drawdown": float(min(drawdowns["underwater"], default=0.0))
+    }
@@ -0,0 +1,117 @@
+import os
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# Arrays attached in a pool worker by `attach_worker_arrays`, keyed by name
+worker_arrays = {}
+_worker_blocks = []
+
+
+def create_shared_array(array: np.ndarray, name: str = None) -> Tuple[shared_memory.SharedMemory, Dict[str, Any]]:
+    """Copy an array into a new shared memory block and return the block with its spec"""
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[...] = array
+    spec = {"name": shm.name, "shape": array.shape, "dtype": array.dtype.str}
+    return shm, spec
+
+
+def attach_shared_memory(name: str, untrack: bool = False) -> shared_memory.SharedMemory:
+    """Attach to an existing shared memory block
+    
+    Child processes of the creator (e.g. pool workers) share its resource tracker and can
+    attach normally. Unrelated processes must pass `untrack=True`, otherwise their resource
+    tracker unlinks the block when they exit even though another process owns it.
+    """
+    if not untrack:
+        return shared_memory.SharedMemory(name=name)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the block on attach
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def attach_shared_array(spec: Dict[str, Any], untrack: bool = False) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Attach to a shared array as a read-only view, without copying it"""
+    shm = attach_shared_memory(spec["name"], untrack=untrack)
+    array = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=shm.buf)
+    array.flags.writeable = False
+    return shm, array
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, which can be fewer than the machine has"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def pool_size(n_workers: Optional[int], n_tasks: int) -> Dict[str, Any]:
+    """Workers to start for `n_tasks`, capped at the available CPUs
+    
+    Asking for more workers than CPUs only makes them compete for cores, so the request
+    is capped and reported as oversubscribed.
+    """
+    cpu_count = available_cpus()
+    requested = n_workers or cpu_count
+    return {
+        "n_workers": max(1, min(requested, cpu_count, n_tasks)),
+        "requested_workers": requested,
+        "cpu_count": cpu_count,
+        "oversubscribed": requested > cpu_count
+    }
+
+
+def attach_worker_arrays(specs: Dict[str, Dict[str, Any]]):
+    """Pool initializer: map shared arrays into this process as `worker_arrays`"""
+    for key, spec in specs.items():
+        shm, array = attach_shared_array(spec)
+        _worker_blocks.append(shm)
+        worker_arrays[key] = array
+
+
+def release_worker_arrays():
+    """Drop the views and close the blocks attached by `attach_worker_arrays`"""
+    worker_arrays.clear()
+    while _worker_blocks:
+        _worker_blocks.pop().close()
+
+
+class SharedArrays:
+    """Context manager that publishes named arrays to shared memory and frees them on exit"""
+
+    def __init__(self, **arrays: np.ndarray):
+        self.arrays = arrays
+        self.blocks = []
+        self.specs = {}
+
+    def __enter__(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            for key, array in self.arrays.items():
+                shm, spec = create_shared_array(array)
+                self.blocks.append(shm)
+                self.specs[key] = spec
+        except Exception:
+            self.close()
+            raise
+        return self.specs
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Release and unlink every block created by this publisher"""
+        for shm in self.blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.blocks = []
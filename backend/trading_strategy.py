@@ -1,12 +1,50 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
+import data_provider
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 import matplotlib.pyplot as plt
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
+
+from models import build_model
+from cross_validation import cross_validate
+from hyperparameter_search import search
+from compiled_model import compile_model
+
+FEATURES = ['Price_to_SMA5', 'Price_to_SMA20', 'Price_to_SMA50',
+            'RSI', 'Momentum5', 'Momentum10', 'Momentum20', 'Volatility']
+
+# Longest look-back of any feature, in bars
+FEATURE_LOOKBACK = 50
+
+def add_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the technical indicator columns computed from 'Close' to a price frame"""
+    # Simple Moving Averages
+    df['SMA5'] = df['Close'].rolling(window=5).mean()
+    df['SMA20'] = df['Close'].rolling(window=20).mean()
+    df['SMA50'] = df['Close'].rolling(window=50).mean()
+    
+    # Price relative to moving averages
+    df['Price_to_SMA5'] = df['Close'] / df['SMA5']
+    df['Price_to_SMA20'] = df['Close'] / df['SMA20']
+    df['Price_to_SMA50'] = df['Close'] / df['SMA50']
+    
+    # Relative Strength Index (RSI)
+    delta = df['Close'].diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
+    rs = gain / loss
+    df['RSI'] = 100 - (100 / (1 + rs))
+    
+    # Momentum
+    df['Momentum5'] = df['Close'] / df['Close'].shift(5) - 1
+    df['Momentum10'] = df['Close'] / df['Close'].shift(10) - 1
+    df['Momentum20'] = df['Close'] / df['Close'].shift(20) - 1
+    
+    # Volatility
+    df['Volatility'] = df['Close'].rolling(window=20).std()
+    
+    return df
 
 class TradingStrategy:
     def __init__(self, ticker="SPY", start_date="2018-01-01", end_date=None):
@@ -15,6 +53,7 @@ class TradingStrategy:
         self.end_date = end_date
         self.data = None
         self.model = None
+        self.compiled_model = None
         self.features = []
         self.target = None
         self.predictions = None
@@ -24,8 +63,8 @@ class TradingStrategy:
         self.metrics = {}
     
     def fetch_data(self):
-        """Fetch historical price data from Yahoo Finance"""
-        self.data = yf.download(self.ticker, start=self.start_date, end=self.end_date)
+        """Fetch historical price data (from Yahoo Finance unless another provider is configured)"""
+        self.data = data_provider.download(self.ticker, start=self.start_date, end=self.end_date)
         if self.data.empty:
             raise ValueError(f"No data found for {self.ticker}")
         return self.data
@@ -35,30 +74,7 @@ class TradingStrategy:
         # Make a copy to avoid SettingWithCopyWarning
         df = self.data.copy()
         
-        # Simple Moving Averages
-        df['SMA5'] = df['Close'].rolling(window=5).mean()
-        df['SMA20'] = df['Close'].rolling(window=20).mean()
-        df['SMA50'] = df['Close'].rolling(window=50).mean()
-        
-        # Price relative to moving averages
-        df['Price_to_SMA5'] = df['Close'] / df['SMA5']
-        df['Price_to_SMA20'] = df['Close'] / df['SMA20']
-        df['Price_to_SMA50'] = df['Close'] / df['SMA50']
-        
-        # Relative Strength Index (RSI)
-        delta = df['Close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-        loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # Momentum
-        df['Momentum5'] = df['Close'] / df['Close'].shift(5) - 1
-        df['Momentum10'] = df['Close'] / df['Close'].shift(10) - 1
-        df['Momentum20'] = df['Close'] / df['Close'].shift(20) - 1
-        
-        # Volatility
-        df['Volatility'] = df['Close'].rolling(window=20).std()
+        add_features(df)
         
         # Target: Next day return (1 if positive, 0 if negative)
         df['Next_Return'] = df['Close'].shift(-1) / df['Close'] - 1
@@ -68,27 +84,44 @@ class TradingStrategy:
         df.dropna(inplace=True)
         
         self.data = df
-        self.features = ['Price_to_SMA5', 'Price_to_SMA20', 'Price_to_SMA50', 
-                        'RSI', 'Momentum5', 'Momentum10', 'Momentum20', 'Volatility']
+        self.features = list(FEATURES)
         self.target = 'Target'
         
         return self.data
     
-    def train_model(self, model_type='random_forest', test_size=0.2, random_state=42):
-        """Train a machine learning model to predict price movements"""
+    def train_model(self, model_type='random_forest', test_size=0.2, random_state=42,
+                    cv=None, n_splits=5, embargo=0.01, n_workers=None, model_params=None):
+        """Train a machine learning model to predict price movements
+        
+        With `cv` set to 'purged_kfold' or 'time_series' the reported metrics come from
+        time-ordered cross-validation and the final model is fit on the full history.
+        """
         X = self.data[self.features]
         y = self.data[self.target]
+        model_params = model_params or {}
+        self.compiled_model = None
+        
+        if cv is not None:
+            # Next_Return looks one day ahead, so purge one sample around each test fold
+            cv_result = cross_validate(
+                X.to_numpy(), y.to_numpy(), model_type=model_type, method=cv,
+                n_splits=n_splits, purge=1, embargo=embargo,
+                random_state=random_state, n_workers=n_workers, model_params=model_params
+            )
+            self.model = build_model(model_type, random_state=random_state, **model_params)
+            self.model.fit(X, y)
+            
+            self.metrics['accuracy'] = cv_result['accuracy']
+            self.metrics['classification_report'] = cv_result['classification_report']
+            self.metrics['cross_validation'] = cv_result
+            
+            return self.metrics
         
         # Split data into training and testing sets
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
         
         # Choose model type
-        if model_type == 'random_forest':
-            self.model = RandomForestClassifier(n_estimators=100, random_state=random_state)
-        elif model_type == 'logistic_regression':
-            self.model = LogisticRegression(random_state=random_state)
-        else:
-            raise ValueError(f"Unsupported model type: {model_type}")
+        self.model = build_model(model_type, random_state=random_state, **model_params)
         
         # Train model
         self.model.fit(X_train, y_train)
@@ -103,11 +136,36 @@ class TradingStrategy:
         
         return self.metrics
     
+    def tune_model(self, model_type='random_forest', method='successive_halving', n_configs=27,
+                   eta=3, metric='sharpe', random_state=42, n_workers=None):
+        """Search model hyperparameters and the signal threshold on a time-ordered validation split"""
+        result = search(
+            self.data[self.features].to_numpy(),
+            self.data[self.target].to_numpy(),
+            self.data['Next_Return'].to_numpy(),
+            model_type=model_type, method=method, n_configs=n_configs, eta=eta,
+            metric=metric, random_state=random_state, n_workers=n_workers
+        )
+        self.metrics['hyperparameter_search'] = result
+        return result['best']
+    
+    def compile_model(self, path: Optional[str] = None):
+        """Convert the trained model to flat arrays for fast scoring, optionally saving them to `path`
+        
+        Once compiled, `generate_signals` scores with the compiled model, which gives the
+        same probabilities as `predict_proba` with much less per-call overhead.
+        """
+        self.compiled_model = compile_model(self.model)
+        if path is not None:
+            self.compiled_model.save(path)
+        return self.compiled_model
+    
     def generate_signals(self, threshold=0.6):
         """Generate trading signals based on model predictions"""
         # Get probability predictions
         X = self.data[self.features]
-        self.data['Probability'] = self.model.predict_proba(X)[:, 1]
+        model = self.compiled_model if self.compiled_model is not None else self.model
+        self.data['Probability'] = model.predict_proba(X)[:, 1]
         
         # Generate signals based on probability threshold
         self.data['Signal'] = 0  # 0 = hold
@@ -123,8 +181,7 @@ class TradingStrategy:
             self.generate_signals()
         
         # Initialize portfolio and positions
-        self.data['Position'] = self.data['Signal'].shift(1)
-        self.data['Position'].fillna(0, inplace=True)
+        self.data['Position'] = self.data['Signal'].shift(1).fillna(0)
         
         # Calculate returns
         self.data['Strategy_Return'] = self.data['Position'] * self.data['Next_Return']
@@ -157,7 +214,8 @@ class TradingStrategy:
         
         # Calculate Sharpe ratio (assuming risk-free rate of 0%)
         daily_returns = self.data['Strategy_Return']
-        sharpe_ratio = np.sqrt(252) * daily_returns.mean() / daily_returns.std()
+        volatility = daily_returns.std()
+        sharpe_ratio = np.sqrt(252) * daily_returns.mean() / volatility if volatility > 0 else 0.0
         
         # Calculate maximum drawdown
         cumulative_returns = self.data['Cumulative_Strategy_Return']
@@ -211,13 +269,27 @@ class TradingStrategy:
             'model_accuracy': f"{self.metrics['accuracy'] * 100:.2f}%"
         }
     
-    def run_strategy(self, model_type='random_forest', threshold=0.6, initial_capital=10000):
-        """Run the complete trading strategy pipeline"""
+    def run_backtest(self, model_type='random_forest', threshold=0.6, initial_capital=10000,
+                     cv=None, n_splits=5, tune=None):
+        """Fetch data, optionally tune, train, generate signals and backtest, without plotting"""
         self.fetch_data()
         self.create_features()
-        self.train_model(model_type=model_type)
+        model_params = None
+        if tune is not None:
+            # The tuned threshold replaces the requested one
+            best = self.tune_model(model_type=model_type, method=tune)
+            model_params = best['params']
+            threshold = best['threshold']
+        self.train_model(model_type=model_type, cv=cv, n_splits=n_splits, model_params=model_params)
         self.generate_signals(threshold=threshold)
         self.backtest(initial_capital=initial_capital)
+        return self.metrics
+    
+    def run_strategy(self, model_type='random_forest', threshold=0.6, initial_capital=10000,
+                     cv=None, n_splits=5, tune=None):
+        """Run the complete trading strategy pipeline"""
+        self.run_backtest(model_type=model_type, threshold=threshold, initial_capital=initial_capital,
+                          cv=cv, n_splits=n_splits, tune=tune)
         plot_path = self.plot_results()
         
         return {
@@ -230,12 +302,16 @@ class TradingStrategy:
 # Helper function to run a strategy with different parameters
 def run_strategy_with_params(ticker="SPY", model_type="random_forest", 
                             start_date="2018-01-01", threshold=0.6, 
-                            initial_capital=10000) -> Dict[str, Any]:
+                            initial_capital=10000, cv: Optional[str] = None,
+                            n_splits=5, tune: Optional[str] = None) -> Dict[str, Any]:
     """Run a trading strategy with the specified parameters"""
     strategy = TradingStrategy(ticker=ticker, start_date=start_date)
     result = strategy.run_strategy(
         model_type=model_type,
         threshold=threshold,
-        initial_capital=initial_capital
+        initial_capital=initial_capital,
+        cv=cv,
+        n_splits=n_splits,
+        tune=tune
     )
     return result
\ No newline at end of file